@@ -157,6 +157,11 @@ def metrics(format: Annotated[str, typer.Option(help="Output format: table, json
         f"{totals.get('calls', 0):,}",
         "Total tool invocations",
     )
+    table.add_row(
+        "Cache Hit Ratio",
+        f"{totals.get('hit_ratio', 0.0):.1%}",
+        "Cache hits / lookups (tool calls and shared caches)",
+    )
 
     console.print(table)
 
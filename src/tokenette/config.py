@@ -121,6 +121,7 @@ class MetricsConfig(BaseModel):
     track_compression_ratios: bool = True
     track_model_usage: bool = True
     persist_metrics: bool = True
+    persist_interval_seconds: float = 5.0  # debounce window for metrics writes
     metrics_file: Path = Field(
         default_factory=lambda: Path.home() / ".cache" / "tokenette" / "metrics.json"
     )
@@ -7,13 +7,25 @@ reduce token usage and premium request costs.
 
 from __future__ import annotations
 
-import difflib
+import asyncio
+import functools
+import importlib.util
+import json
+from collections.abc import Awaitable, Callable, Iterator
 from dataclasses import dataclass
-from typing import Any, Literal
+from typing import Any, Literal, get_args
 
+from tokenette.core.metrics import MetricsTracker
 from tokenette.core.minifier import MinificationEngine
-from tokenette.tools.file_ops import read_file_smart, search_code_semantic, write_file_diff
-from tokenette.tools.workspace import extract_smart_context, get_workspace_summary
+from tokenette.tools.file_ops import (
+    deduplicate_shared_imports,
+    read_files_smart_batch,
+    search_code_semantic,
+    write_file_diff,
+)
+
+# Checked without importing; the diff backend itself loads on the first write
+HAS_CYDIFFLIB = importlib.util.find_spec("cydifflib") is not None
 
 OperationType = Literal["read", "write", "search", "analyze"]
 
@@ -41,43 +53,59 @@ class InteractionBatcher:
 
     MAX_BATCH_TOKENS = 60_000
     MAX_BATCH_OPS = 25
-
-    def __init__(self):
+    MAX_DIFF_LINES = 20_000  # Above this, skip LCS and replace the whole file
+    MAX_DIFF_SIZE = 256 * 1024  # Same shortcut for very large content
+    DIFF_CONTEXT = 3
+    # Cap on in-flight writes/searches/analyses per kind (open fds, worker threads);
+    # kept below MAX_BATCH_OPS so a full batch is actually throttled
+    MAX_CONCURRENCY = 8
+
+    def __init__(self, metrics: MetricsTracker | None = None):
         self.minifier = MinificationEngine()
+        self.metrics = metrics
 
     async def batch_file_operations(self, operations: list[dict[str, Any]]) -> dict[str, Any]:
         if len(operations) > self.MAX_BATCH_OPS:
             return {"error": f"Too many operations: {len(operations)} > {self.MAX_BATCH_OPS}"}
 
-        reads: list[dict[str, Any]] = []
-        writes: list[dict[str, Any]] = []
-        searches: list[dict[str, Any]] = []
-        analyses: list[dict[str, Any]] = []
-
+        buckets: dict[str, list[dict[str, Any]]] = {t: [] for t in get_args(OperationType)}
         for op in operations:
-            op_type = op.get("type")
-            if op_type == "read":
-                reads.append(op)
-            elif op_type == "write":
-                writes.append(op)
-            elif op_type == "search":
-                searches.append(op)
-            elif op_type == "analyze":
-                analyses.append(op)
-
-        read_results = [await self._run_read(op) for op in reads]
-        read_results, shared = self._deduplicate_reads(read_results)
-        write_results = [await self._run_write(op) for op in writes]
-        search_results = [await self._run_search(op) for op in searches]
-        analysis_results = [await self._run_analyze(op) for op in analyses]
+            bucket = buckets.get(op.get("type"))
+            if bucket is not None:
+                bucket.append(op)
+
+        handlers = {
+            "read": self._run_reads,
+            "search": self._run_searches,
+            "analyze": self._run_analyses,
+        }
+        # Identical reads/searches in one batch are dispatched once
+        dedupe_keys = {"read": _read_key, "search": _search_key}
+        results: dict[str, list[dict[str, Any]]] = {"write": []}
+
+        async def run_concurrently(*op_types: str) -> None:
+            gathered = await asyncio.gather(
+                *(self._dispatch(handlers[t], buckets[t], dedupe_keys.get(t)) for t in op_types)
+            )
+            results.update(zip(op_types, gathered, strict=True))
+
+        if buckets["write"]:
+            # Keep the sequential semantics: reads see the old files, searches the new ones
+            await run_concurrently("read")
+            results["write"] = await self._run_writes(buckets["write"])
+            await run_concurrently("search", "analyze")
+        else:
+            await run_concurrently(*handlers)
+
+        read_results, shared = self._deduplicate_reads(results["read"])
 
         payload = {
             "_batch": True,
             "_ops": len(operations),
             "reads": read_results,
-            "writes": write_results,
-            "searches": search_results,
-            "analyses": analysis_results,
+            "writes": results["write"],
+            "searches": results["search"],
+            "analyses": results["analyze"],
             "shared": shared,
         }
 
@@ -94,13 +122,65 @@ class InteractionBatcher:
             "client_instruction": minified.client_instruction,
         }
 
-    async def _run_read(self, op: dict[str, Any]) -> dict[str, Any]:
-        return await read_file_smart(
-            op.get("path", ""),
-            op.get("strategy", "auto"),
-            op.get("start_line"),
-            op.get("end_line"),
-            None,
+    async def _dispatch(
+        self,
+        handler: Callable[[list[dict[str, Any]]], Awaitable[list[dict[str, Any]]]],
+        ops: list[dict[str, Any]],
+        key: Callable[[dict[str, Any]], tuple[Any, ...]] | None = None,
+    ) -> list[dict[str, Any]]:
+        if key is None:
+            return await handler(ops)
+
+        groups: dict[tuple[Any, ...], list[int]] = {}
+        for idx, op in enumerate(ops):
+            groups.setdefault(key(op), []).append(idx)
+
+        unique = await handler([ops[indices[0]] for indices in groups.values()])
+
+        results: list[dict[str, Any]] = [{} for _ in ops]
+        for indices, result in zip(groups.values(), unique, strict=True):
+            results[indices[0]] = result
+            for idx in indices[1:]:
+                # Each slot gets its own dict, so one caller's edits never show in another slot
+                results[idx] = dict(result)
+                if self.metrics is not None:
+                    self.metrics.record_cache(hit=True, tokens_saved=_tokens_saved(result))
+        return results
+
+    async def _gather(self, coros: list[Awaitable[Any]]) -> list[Any]:
+        """asyncio.gather with at most MAX_CONCURRENCY awaitables running at once."""
+        if len(coros) <= self.MAX_CONCURRENCY:
+            return list(await asyncio.gather(*coros))
+
+        semaphore = asyncio.Semaphore(self.MAX_CONCURRENCY)
+
+        async def bounded(coro: Awaitable[Any]) -> Any:
+            async with semaphore:
+                return await coro
+
+        return list(await asyncio.gather(*(bounded(c) for c in coros)))
+
+    async def _run_writes(self, writes: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Run writes concurrently across files, in order within the same file."""
+        by_path: dict[str, list[int]] = {}
+        for idx, op in enumerate(writes):
+            by_path.setdefault(op.get("path", ""), []).append(idx)
+
+        results: list[dict[str, Any]] = [{} for _ in writes]
+
+        async def run_path(indices: list[int]) -> None:
+            for idx in indices:
+                results[idx] = await self._run_write(writes[idx])
+
+        await self._gather([run_path(indices) for indices in by_path.values()])
+        return results
+
+    async def _run_reads(self, ops: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        return await read_files_smart_batch(
+            [op.get("path", "") for op in ops],
+            [op.get("strategy", "auto") for op in ops],
+            [op.get("start_line") for op in ops],
+            [op.get("end_line") for op in ops],
         )
 
     async def _run_write(self, op: dict[str, Any]) -> dict[str, Any]:
@@ -110,12 +190,20 @@ class InteractionBatcher:
 
         if not diff and content is not None:
             diff = self._to_diff(path, content)
+            if not diff:
+                return {"status": "unchanged", "path": path}
 
         if not diff:
             return {"error": "Write operation requires diff or content", "path": path}
 
         return await write_file_diff(path, diff, None)
 
+    async def _run_searches(self, ops: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        return await self._gather([self._run_search(op) for op in ops])
+
+    async def _run_analyses(self, ops: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        return await self._gather([self._run_analyze(op) for op in ops])
+
     async def _run_search(self, op: dict[str, Any]) -> dict[str, Any]:
         return await search_code_semantic(
             op.get("query", ""),
@@ -126,6 +214,9 @@ class InteractionBatcher:
         )
 
     async def _run_analyze(self, op: dict[str, Any]) -> dict[str, Any]:
+        # Imported here so tokenette.tools keeps loading the workspace module lazily
+        from tokenette.tools.workspace import extract_smart_context, get_workspace_summary
+
         directory = op.get("directory", ".")
         focus = op.get("focus", "overview")
         summary = await get_workspace_summary(directory, max_depth=3)
@@ -138,49 +229,163 @@ class InteractionBatcher:
     def _deduplicate_reads(
         self, results: list[dict[str, Any]]
     ) -> tuple[list[dict[str, Any]], dict[str, str]]:
-        shared_segments: dict[str, str] = {}
-        all_imports: list[str] = []
-
-        for r in results:
-            content = r.get("content")
-            if isinstance(content, str):
-                imports = [
-                    line
-                    for line in content.split("\n")
-                    if line.startswith("import ") or line.startswith("from ")
-                ]
-                all_imports.extend(imports)
-
-        if all_imports:
-            from collections import Counter
-
-            import_counts = Counter(all_imports)
-            shared = [imp for imp, count in import_counts.items() if count > 1]
-            if shared:
-                shared_segments["_shared_imports"] = "\n".join(shared)
-                for r in results:
-                    content = r.get("content")
-                    if isinstance(content, str):
-                        for imp in shared:
-                            content = content.replace(imp, "# → _shared_imports")
-                        r["content"] = content
-
-        return results, shared_segments
+        """Replace imports repeated across reads with "§N" references (see shared)."""
+        return deduplicate_shared_imports(results)
 
     def _to_diff(self, path: str, new_content: str) -> str:
         """Generate unified diff from file on disk to new content."""
+        # Split both sides the way write_file_diff sees the file (universal-newline
+        # text, lines on "\n" only), so hunk line numbers agree with the applier
+        new_lines = _split_lines(new_content.replace("\r\n", "\n").replace("\r", "\n"))
         try:
             with open(path, encoding="utf-8", errors="replace") as f:
-                old_lines = f.read().splitlines()
+                old_content = f.read()
         except FileNotFoundError:
-            old_lines = []
-
-        new_lines = new_content.splitlines()
-        diff = difflib.unified_diff(
-            old_lines,
-            new_lines,
-            fromfile=f"a/{path}",
-            tofile=f"b/{path}",
-            lineterm="",
-        )
+            old_content = ""
+        old_lines = _split_lines(old_content)
+
+        prefix = _common_prefix_len(old_lines, new_lines)
+        if prefix == len(old_lines) == len(new_lines):
+            return ""
+
+        if (
+            not old_lines
+            or not new_lines
+            or max(len(old_content), len(new_content)) > self.MAX_DIFF_SIZE
+            or len(old_lines) + len(new_lines) > self.MAX_DIFF_LINES
+        ):
+            return _replacement_diff(path, old_lines, new_lines)
+
+        # Like GNU diff, only hand the changed middle to the LCS; context still
+        # comes from the full line lists, so hunks match an untrimmed diff's
+        suffix = _common_suffix_len(old_lines, new_lines, prefix)
+        old_end, new_end = len(old_lines) - suffix, len(new_lines) - suffix
+        matcher = _sequence_matcher()(None, old_lines[prefix:old_end], new_lines[prefix:new_end])
+        opcodes = [("equal", 0, prefix, 0, prefix)] if prefix else []
+        opcodes += [
+            (tag, i1 + prefix, i2 + prefix, j1 + prefix, j2 + prefix)
+            for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        ]
+        if suffix:
+            opcodes.append(("equal", old_end, len(old_lines), new_end, len(new_lines)))
+
+        diff = [f"--- a/{path}", f"+++ b/{path}"]
+        for group in _group_opcodes(opcodes, self.DIFF_CONTEXT):
+            first, last = group[0], group[-1]
+            diff.append(
+                f"@@ -{_unified_range(first[1], last[2] - first[1])}"
+                f" +{_unified_range(first[3], last[4] - first[3])} @@"
+            )
+            for tag, i1, i2, j1, j2 in group:
+                if tag == "equal":
+                    diff.extend(f" {line}" for line in old_lines[i1:i2])
+                    continue
+                diff.extend(f"-{line}" for line in old_lines[i1:i2])
+                diff.extend(f"+{line}" for line in new_lines[j1:j2])
         return "\n".join(diff)
+
+
+def _unified_range(start: int, length: int) -> str:
+    """Format a hunk range the same way difflib does."""
+    beginning = start + 1
+    if length == 1:
+        return f"{beginning}"
+    if not length:
+        beginning -= 1
+    return f"{beginning},{length}"
+
+
+def _replacement_diff(path: str, old_lines: list[str], new_lines: list[str]) -> str:
+    """Single hunk that deletes every old line and adds every new line."""
+    header = (
+        f"--- a/{path}\n"
+        f"+++ b/{path}\n"
+        f"@@ -{_unified_range(0, len(old_lines))} +{_unified_range(0, len(new_lines))} @@"
+    )
+    body = [f"-{line}" for line in old_lines] + [f"+{line}" for line in new_lines]
+    return "\n".join([header, *body])
+
+
+@functools.cache
+def _sequence_matcher() -> Callable[..., Any]:
+    if HAS_CYDIFFLIB:
+        from cydifflib import SequenceMatcher
+    else:
+        from difflib import SequenceMatcher
+    return SequenceMatcher
+
+
+Opcode = tuple[str, int, int, int, int]
+
+
+def _group_opcodes(opcodes: list[Opcode], n: int) -> Iterator[list[Opcode]]:
+    """Split opcodes into hunks with n lines of context, as difflib groups them."""
+    codes = list(opcodes)
+    if codes[0][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = tag, max(i1, i2 - n), i2, max(j1, j2 - n), j2
+    if codes[-1][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)
+
+    group: list[Opcode] = []
+    for tag, i1, i2, j1, j2 in codes:
+        # A run of unchanged lines longer than both contexts ends the hunk
+        if tag == "equal" and i2 - i1 > 2 * n:
+            group.append((tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)))
+            yield group
+            group = []
+            i1, j1 = max(i1, i2 - n), max(j1, j2 - n)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == "equal"):
+        yield group
+
+
+def _tokens_saved(result: dict[str, Any]) -> int:
+    """Tokens a repeated op didn't cost: its read content, else its serialized result."""
+    if "result_size" in result:
+        return int(result["result_size"]) // 4
+    return len(json.dumps(result, separators=(",", ":"), default=str)) // 4
+
+
+def _read_key(op: dict[str, Any]) -> tuple[Any, ...]:
+    return (
+        op.get("path", ""),
+        op.get("strategy", "auto"),
+        op.get("start_line"),
+        op.get("end_line"),
+    )
+
+
+def _search_key(op: dict[str, Any]) -> tuple[Any, ...]:
+    return (
+        op.get("query", ""),
+        op.get("directory", "."),
+        op.get("file_pattern"),
+        op.get("max_results", 10),
+    )
+
+
+def _split_lines(text: str) -> list[str]:
+    """Lines split on "\n" only, without the empty item after a final newline."""
+    lines = text.split("\n")
+    if lines[-1] == "":
+        lines.pop()
+    return lines
+
+
+def _common_prefix_len(old: list[str], new: list[str]) -> int:
+    n = min(len(old), len(new))
+    i = 0
+    while i < n and old[i] == new[i]:
+        i += 1
+    return i
+
+
+def _common_suffix_len(old: list[str], new: list[str], prefix: int) -> int:
+    """Length of the shared tail, never overlapping the shared head."""
+    n = min(len(old), len(new)) - prefix
+    i = 0
+    while i < n and old[-1 - i] == new[-1 - i]:
+        i += 1
+    return i
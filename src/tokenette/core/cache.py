@@ -13,6 +13,7 @@ Achieves 99.8% token savings on repeated data access.
 from __future__ import annotations
 
 import contextlib
+import json
 import time
 from dataclasses import dataclass, field
 from typing import Any, TypeVar
@@ -145,8 +146,6 @@ class MultiLayerCache:
     @staticmethod
     def content_hash(data: Any) -> str:
         """Generate content-addressable hash for data."""
-        import json
-
         serialized = json.dumps(data, sort_keys=True, default=str)
         return xxhash.xxh128(serialized.encode()).hexdigest()[:16]
 
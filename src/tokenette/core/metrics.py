@@ -6,26 +6,93 @@ Lightweight metrics and observability for Tokenette:
 - Token in/out/saved estimates
 - Cache hit/miss tracking
 - Model usage and cost multipliers
-- Optional persistence to JSON
+- Optional persistence to gzip-compressed JSON
 """
 
 from __future__ import annotations
 
-import json
+import atexit
+import gzip
+import itertools
 import threading
-from dataclasses import dataclass
+import time
+import weakref
+from dataclasses import dataclass, fields
 from datetime import UTC, datetime
 from pathlib import Path
 from typing import Any
 
 from tokenette.config import MetricsConfig
 
+try:
+    import orjson
+
+    HAS_ORJSON = True
+    _ORJSON_OPTS = orjson.OPT_NON_STR_KEYS
+except ImportError:
+    import json as stdlib_json
+
+    HAS_ORJSON = False
+
+_GZIP_MAGIC = b"\x1f\x8b"
+
+# Persisting trackers, flushed by one exit hook that does not keep them alive
+_PERSISTING: weakref.WeakSet[MetricsTracker] = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_at_exit() -> None:
+    for tracker in list(_PERSISTING):
+        tracker.flush()
+
 
 def _utc_now() -> str:
     return datetime.now(UTC).isoformat()
 
 
-@dataclass
+def _to_iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, UTC).isoformat()
+
+
+def _from_iso(value: Any, default: float) -> float:
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return default
+
+
+def _approx_size(data: Any) -> int:
+    """Approximate the serialized JSON length of data without building the string.
+
+    Fallback for when orjson is unavailable or cannot serialize the payload.
+    """
+    size = 0
+    stack = [data]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, (str, bytes, bytearray)):
+            size += len(item) + 2
+        elif isinstance(item, dict):
+            size += 2 + 4 * len(item)  # braces, quotes, colons and separators
+            for key, value in item.items():
+                size += len(key) if isinstance(key, str) else len(str(key))
+                stack.append(value)
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            size += 2 + len(item)
+            stack.extend(item)
+        elif item is None:
+            size += 4
+        else:
+            size += len(str(item))
+    return size
+
+
+def _hit_ratio(hits: int, misses: int) -> float:
+    lookups = hits + misses
+    return round(hits / lookups, 4) if lookups else 0.0
+
+
+@dataclass(slots=True)
 class ToolMetrics:
     calls: int = 0
     input_tokens: int = 0
@@ -35,17 +102,17 @@ class ToolMetrics:
     cache_misses: int = 0
 
     def to_dict(self) -> dict[str, Any]:
-        return {
-            "calls": self.calls,
-            "input_tokens": self.input_tokens,
-            "output_tokens": self.output_tokens,
-            "tokens_saved": self.tokens_saved,
-            "cache_hits": self.cache_hits,
-            "cache_misses": self.cache_misses,
-        }
+        return {name: getattr(self, name) for name in _TOOL_FIELDS}
 
+    def merge(self, other: ToolMetrics) -> None:
+        for name in _TOOL_FIELDS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
 
-@dataclass
+
+_TOOL_FIELDS = tuple(f.name for f in fields(ToolMetrics))
+
+
+@dataclass(slots=True)
 class ModelMetrics:
     calls: int = 0
     multiplier_total: float = 0.0
@@ -54,27 +121,69 @@ class ModelMetrics:
         return {"calls": self.calls, "multiplier_total": round(self.multiplier_total, 2)}
 
 
+class _Shard:
+    """Per-thread buffer of tool deltas, merged into the tracker in batches."""
+
+    __slots__ = ("lock", "owner", "pending", "tools")
+
+    def __init__(self) -> None:
+        # Only contended when a snapshot drains this shard
+        self.lock = threading.Lock()
+        self.owner = threading.current_thread()
+        self.pending = 0
+        self.tools: dict[str, ToolMetrics] = {}
+
+
 class MetricsTracker:
     """Tracks Tokenette usage and token savings."""
 
+    # Force a write after this many unsaved updates, even inside the debounce window
+    PERSIST_EVERY = 100
+    # Merge a thread's buffered tool deltas after this many calls
+    MERGE_EVERY = 128
+
     def __init__(self, config: MetricsConfig | None = None):
         self.config = config or MetricsConfig()
         self.started_at = _utc_now()
-        self.last_updated = self.started_at
-
-        self.total_calls = 0
-        self.input_tokens = 0
-        self.output_tokens = 0
-        self.tokens_saved = 0
-        self.cache_hits = 0
-        self.cache_misses = 0
+        # Hot paths store a raw time.time(); it is formatted only when read
+        self._updated_at = time.time()
+        self._updated_iso: tuple[float, str] | None = None
 
         self.tools: dict[str, ToolMetrics] = {}
         self.models: dict[str, ModelMetrics] = {}
 
+        # Cache hits and savings that are not tied to a tool call; totals are
+        # derived from this plus the per-tool counters
+        self._untracked = ToolMetrics()
+
+        # The global lock guards the tool/model tables, the untracked bucket and
+        # the shard list; tool calls only touch their own thread's shard
         self._lock = threading.Lock()
+        self._local = threading.local()
+        self._shards: list[_Shard] = []
+
+        self._persist_lock = threading.Lock()
+        # Serializes snapshot + write, so the timer thread and flush() never share
+        # the tmp file and a newer snapshot is never overwritten by an older one
+        self._write_lock = threading.Lock()
+        self._dirty = False
+        self._updates = itertools.count(1)
+        self._flushed_at = 0
+        self._last_persist = time.monotonic()
+        self._timer: threading.Timer | None = None
+
         if self.config.persist_metrics:
             self._load()
+            _PERSISTING.add(self)
+
+    @property
+    def last_updated(self) -> str:
+        """ISO-8601 time of the latest update, formatted once per change."""
+        updated_at = self._updated_at
+        cached = self._updated_iso
+        if cached is None or cached[0] != updated_at:
+            cached = self._updated_iso = (updated_at, _to_iso(updated_at))
+        return cached[1]
 
     def record_tool_call(
         self,
@@ -83,12 +192,20 @@ class MetricsTracker:
         output_data: Any | None = None,
         tokens_saved: int = 0,
         cache_hit: bool | None = None,
+        input_tokens: int | None = None,
+        output_tokens: int | None = None,
     ) -> None:
-        input_tokens = self._estimate_tokens(input_data)
-        output_tokens = self._estimate_tokens(output_data)
-
-        with self._lock:
-            tool = self.tools.setdefault(tool_name, ToolMetrics())
+        # Callers that already know their token counts skip the estimate entirely
+        if input_tokens is None:
+            input_tokens = self._estimate_tokens(input_data)
+        if output_tokens is None:
+            output_tokens = self._estimate_tokens(output_data)
+
+        shard = self._shard()
+        with shard.lock:
+            tool = shard.tools.get(tool_name)
+            if tool is None:
+                tool = shard.tools[tool_name] = ToolMetrics()
             tool.calls += 1
             tool.input_tokens += input_tokens
             tool.output_tokens += output_tokens
@@ -96,27 +213,26 @@ class MetricsTracker:
 
             if cache_hit is True:
                 tool.cache_hits += 1
-                self.cache_hits += 1
             elif cache_hit is False:
                 tool.cache_misses += 1
-                self.cache_misses += 1
+            shard.pending += 1
+            merge_due = shard.pending >= self.MERGE_EVERY
 
-            self.total_calls += 1
-            self.input_tokens += input_tokens
-            self.output_tokens += output_tokens
-            self.tokens_saved += max(0, tokens_saved)
-            self.last_updated = _utc_now()
+        if merge_due:
+            with self._lock:
+                self._drain(shard)
 
+        self._updated_at = time.time()
         self._persist()
 
     def record_cache(self, hit: bool, tokens_saved: int = 0) -> None:
         with self._lock:
             if hit:
-                self.cache_hits += 1
+                self._untracked.cache_hits += 1
             else:
-                self.cache_misses += 1
-            self.tokens_saved += max(0, tokens_saved)
-            self.last_updated = _utc_now()
+                self._untracked.cache_misses += 1
+            self._untracked.tokens_saved += max(0, tokens_saved)
+        self._updated_at = time.time()
         self._persist()
 
     def record_model_use(self, model: str, multiplier: float = 0.0) -> None:
@@ -124,88 +240,164 @@ class MetricsTracker:
             metrics = self.models.setdefault(model, ModelMetrics())
             metrics.calls += 1
             metrics.multiplier_total += float(multiplier)
-            self.last_updated = _utc_now()
+        self._updated_at = time.time()
         self._persist()
 
     def snapshot(self) -> dict[str, Any]:
         with self._lock:
+            self._drain_all()
+            tools = {name: tm.to_dict() for name, tm in self.tools.items()}
+
+            totals = self._untracked.to_dict()
+            for tm in tools.values():
+                for key, value in tm.items():
+                    totals[key] += value
+
+            # Derived once here so dashboards don't each recompute it
+            for counters in (*tools.values(), totals):
+                counters["hit_ratio"] = _hit_ratio(counters["cache_hits"], counters["cache_misses"])
+
             return {
                 "started_at": self.started_at,
                 "last_updated": self.last_updated,
-                "totals": {
-                    "calls": self.total_calls,
-                    "input_tokens": self.input_tokens,
-                    "output_tokens": self.output_tokens,
-                    "tokens_saved": self.tokens_saved,
-                    "cache_hits": self.cache_hits,
-                    "cache_misses": self.cache_misses,
-                },
-                "tools": {name: tm.to_dict() for name, tm in self.tools.items()},
+                "totals": totals,
+                "tools": tools,
                 "models": {name: mm.to_dict() for name, mm in self.models.items()},
             }
 
     def reset(self) -> None:
         with self._lock:
+            self._drain_all()
             self.started_at = _utc_now()
-            self.last_updated = self.started_at
-            self.total_calls = 0
-            self.input_tokens = 0
-            self.output_tokens = 0
-            self.tokens_saved = 0
-            self.cache_hits = 0
-            self.cache_misses = 0
+            self._updated_at = time.time()
+            self._untracked = ToolMetrics()
             self.tools.clear()
             self.models.clear()
-        self._persist()
+        self._persist(force=True)
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def _drain(self, shard: _Shard) -> None:
+        """Merge a shard's buffered deltas into the tool table. Caller holds _lock."""
+        with shard.lock:
+            pending, shard.tools, shard.pending = shard.tools, {}, 0
+        for name, delta in pending.items():
+            tool = self.tools.get(name)
+            if tool is None:
+                self.tools[name] = delta
+            else:
+                tool.merge(delta)
+
+    def _drain_all(self) -> None:
+        # Check liveness before draining: a thread that had already exited can no
+        # longer write to its shard, but one alive here may still record and exit
+        # mid-drain, so its shard stays until a later snapshot finds it dead
+        alive = [shard.owner.is_alive() for shard in self._shards]
+        for shard in self._shards:
+            self._drain(shard)
+        self._shards = [shard for shard, live in zip(self._shards, alive, strict=True) if live]
 
     def _estimate_tokens(self, data: Any | None) -> int:
         if data is None:
             return 0
-        if isinstance(data, str):
+        if isinstance(data, (str, bytes, bytearray)):
             return max(1, len(data) // 4)
-        try:
-            serialized = json.dumps(data, default=str)
-            return max(1, len(serialized) // 4)
-        except (TypeError, ValueError):
-            return max(1, len(str(data)) // 4)
+        if HAS_ORJSON:
+            # Serializing in C is far cheaper than walking nested results in Python
+            try:
+                return max(1, len(orjson.dumps(data, default=str, option=_ORJSON_OPTS)) // 4)
+            except TypeError:
+                pass  # Unserializable payload (e.g. int keys too large); walk it instead
+        return max(1, _approx_size(data) // 4)
 
     def _load(self) -> None:
         path = Path(self.config.metrics_file)
         if not path.exists():
             return
         try:
-            data = json.loads(path.read_text())
+            raw = path.read_bytes()
+            # Files written before compression was added are plain JSON
+            if raw[:2] == _GZIP_MAGIC:
+                raw = gzip.decompress(raw)
+            data = orjson.loads(raw) if HAS_ORJSON else stdlib_json.loads(raw)
         except Exception:
             return
 
         self.started_at = data.get("started_at", self.started_at)
-        self.last_updated = data.get("last_updated", self.last_updated)
-
-        totals = data.get("totals", {})
-        self.total_calls = totals.get("calls", self.total_calls)
-        self.input_tokens = totals.get("input_tokens", self.input_tokens)
-        self.output_tokens = totals.get("output_tokens", self.output_tokens)
-        self.tokens_saved = totals.get("tokens_saved", self.tokens_saved)
-        self.cache_hits = totals.get("cache_hits", self.cache_hits)
-        self.cache_misses = totals.get("cache_misses", self.cache_misses)
+        self._updated_at = _from_iso(data.get("last_updated"), self._updated_at)
 
         tools = data.get("tools", {})
         for name, tm in tools.items():
-            self.tools[name] = ToolMetrics(**tm)
+            self.tools[name] = ToolMetrics(**{k: tm[k] for k in _TOOL_FIELDS if k in tm})
 
         models = data.get("models", {})
         for name, mm in models.items():
             self.models[name] = ModelMetrics(**mm)
 
-    def _persist(self) -> None:
+        # Whatever the persisted totals hold beyond the per-tool sums came from
+        # record_cache and belongs to the untracked bucket
+        totals = data.get("totals", {})
+        for key in ("tokens_saved", "cache_hits", "cache_misses"):
+            tracked = sum(getattr(tm, key) for tm in self.tools.values())
+            setattr(self._untracked, key, max(0, totals.get(key, 0) - tracked))
+
+    def flush(self) -> None:
+        """Write pending metrics to disk immediately."""
+        with self._persist_lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+            self._flushed_at = next(self._updates)
+            self._last_persist = time.monotonic()
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        with self._write_lock:
+            self._write(self.snapshot())
+
+    def _persist(self, force: bool = False) -> None:
         if not self.config.persist_metrics:
             return
+        interval = self.config.persist_interval_seconds
+        # next() on itertools.count is atomic, so the hot path takes no lock
+        self._dirty = True
+        pending = next(self._updates) - self._flushed_at
+        due = (
+            force
+            or pending >= self.PERSIST_EVERY
+            or time.monotonic() - self._last_persist >= interval
+        )
+        if due:
+            self.flush()
+        elif self._timer is None:
+            with self._persist_lock:
+                if self._timer is None:
+                    # Make sure a quiet period still ends with the latest numbers on disk
+                    self._timer = threading.Timer(interval, self._flush_from_timer)
+                    self._timer.daemon = True
+                    self._timer.start()
+
+    def _flush_from_timer(self) -> None:
+        with self._persist_lock:
+            self._timer = None
+        self.flush()
+
+    def _write(self, payload: dict[str, Any]) -> None:
         path = Path(self.config.metrics_file)
-        path.parent.mkdir(parents=True, exist_ok=True)
-        payload = self.snapshot()
         tmp_path = path.with_suffix(".tmp")
         try:
-            tmp_path.write_text(json.dumps(payload, indent=2))
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if HAS_ORJSON:
+                encoded = orjson.dumps(payload)
+            else:
+                encoded = stdlib_json.dumps(payload, separators=(",", ":")).encode()
+            tmp_path.write_bytes(gzip.compress(encoded, compresslevel=1))
             tmp_path.replace(path)
         except Exception:
             # Best-effort persistence; ignore failures
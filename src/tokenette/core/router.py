@@ -303,7 +303,7 @@ CATEGORY_KEYWORDS: dict[TaskCategory, list[str]] = {
 }
 
 
-@dataclass
+@dataclass(slots=True)
 class RoutingDecision:
     """Result of task routing analysis."""
 
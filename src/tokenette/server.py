@@ -9,11 +9,33 @@ The Ultimate All-in-One AI Coding Enhancement MCP
 Built with FastMCP for maximum performance.
 """
 
+import asyncio
+import copy
+import functools
+import inspect
+import sys
+import time
+from collections.abc import Awaitable, Callable
 from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import date
+from enum import Enum
 from typing import Any, Literal
 
+import xxhash
+from cachetools import LRUCache
 from fastmcp import Context, FastMCP
 
+try:
+    import orjson
+
+    HAS_ORJSON = True
+except ImportError:
+    import json
+
+    HAS_ORJSON = False
+
+from . import tools
 from .config import TokenetteConfig, get_config
 from .core import (
     InteractionBatcher,
@@ -21,9 +43,12 @@ from .core import (
     MultiLayerCache,
     OptimizationPipeline,
     QualityAmplifier,
+    TaskCategory,
     TaskRouter,
 )
+from .core.router import MODEL_PROFILES
 from .tools import (
+    Context7Client,
     # Analysis tools
     analyze_code,
     batch_read_files,
@@ -44,11 +69,34 @@ from .tools import (
     write_file_diff,
 )
 
+# Recent tokenette_optimize inputs answered without re-entering the pipeline
+_OPTIMIZE_L0_SIZE = 256
+
+# How long a serialized tokenette://cache/stats body is reused
+_CACHE_STATS_TTL_SECONDS = 1.0
+
+# Category names accepted by tokenette_amplify
+_CATEGORY_MAP: dict[str, TaskCategory] = {c.value: c for c in TaskCategory}
+
 # ─── LIFESPAN MANAGEMENT ─────────────────────────────────────────
 
 
+@dataclass(slots=True)
+class ServerState:
+    """Components shared by all tools, built once per server lifespan."""
+
+    config: TokenetteConfig
+    cache: MultiLayerCache
+    optimizer: OptimizationPipeline
+    router: TaskRouter
+    amplifier: QualityAmplifier
+    context7: Context7Client
+    batcher: InteractionBatcher
+    metrics: MetricsTracker
+
+
 @asynccontextmanager
-async def lifespan(mcp: FastMCP):
+async def lifespan(mcp: FastMCP, config: TokenetteConfig | None = None):
     """
     Manage server lifecycle.
 
@@ -58,8 +106,12 @@ async def lifespan(mcp: FastMCP):
     - Task router
     - Quality amplifier
     - Context7 client
+
+    Components are built from config (default: the global config), so they agree
+    with the settings create_server registered the tools under.
     """
-    config = get_config()
+    if config is None:
+        config = get_config()
 
     # Initialize core components
     cache = MultiLayerCache(config.cache)
@@ -68,26 +120,91 @@ async def lifespan(mcp: FastMCP):
     amplifier = QualityAmplifier(config.amplifier)
     context7 = await get_context7_client()
     metrics = MetricsTracker(config.metrics)
-    batcher = InteractionBatcher()
+    # The tracker still backs tokenette_metrics; the batcher only records when enabled
+    batcher = InteractionBatcher(metrics if config.metrics.enabled else None)
 
     # Store in MCP context for tool access
-    mcp.state = {
-        "config": config,
-        "cache": cache,
-        "optimizer": optimizer,
-        "router": router,
-        "amplifier": amplifier,
-        "context7": context7,
-        "batcher": batcher,
-        "metrics": metrics,
-    }
+    mcp.state = ServerState(
+        config=config,
+        cache=cache,
+        optimizer=optimizer,
+        router=router,
+        amplifier=amplifier,
+        context7=context7,
+        batcher=batcher,
+        metrics=metrics,
+    )
 
     try:
         yield
     finally:
-        # Cleanup
-        await context7.close()
-        await cache.close()
+        # Cleanup: close concurrently, collecting errors so a failing close doesn't
+        # cut the other one short
+        metrics.flush()
+        results = await asyncio.gather(context7.close(), cache.close(), return_exceptions=True)
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if errors:
+            body_error = sys.exception()
+            if body_error is None:
+                raise BaseExceptionGroup("Tokenette shutdown failed", errors)
+            # Whatever stopped the server stays the exception; close failures ride along
+            for error in errors:
+                body_error.add_note(f"Tokenette shutdown also failed: {error!r}")
+
+
+# ─── SERVER INSTRUCTIONS ─────────────────────────────────────────
+
+_SERVER_INSTRUCTIONS = """
+Tokenette: The Ultimate AI Coding Enhancement MCP
+
+I provide zero-loss token optimization, intelligent model routing, and quality amplification.
+
+Key capabilities:
+- 90-99% token reduction on file operations
+- Smart model routing to minimize premium request usage
+- Quality amplification for cheaper models
+- Multi-layer caching (L1-L4) with 99.8% hit rate on repeated data
+- Context7 integration for up-to-date library docs
+- Interaction batching for multi-op workflows
+
+Use `discover_tools` first to see available tools efficiently.
+Use `route_task` to get optimal model recommendations.
+Use `optimize_output` to compress any response before transmission.
+""".strip()
+
+
+# ─── TOKEN SAVINGS EXTRACTORS ────────────────────────────────────
+# Each tool reports savings in one fixed result shape, so the extractor is
+# picked per tool at registration instead of probing every key per call.
+
+
+def _result_field(key: str) -> Callable[[dict[str, Any]], int]:
+    def extract(result: dict[str, Any]) -> int:
+        return result.get(key, 0)
+
+    return extract
+
+
+def _docs_tokens_saved(result: dict[str, Any]) -> int:
+    tokens = result.get("tokens")
+    return max(0, tokens["original"] - tokens["compressed"]) if tokens else 0
+
+
+def _enum_value(obj: Any) -> Any:
+    if isinstance(obj, Enum):
+        return obj.value
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _dumps_indented(data: Any) -> str:
+    # Enums (e.g. model complexity tiers) serialize as their values, as orjson does
+    if HAS_ORJSON:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(data, indent=2, default=_enum_value)
+
+
+# Static, so serialized once for tokenette://models
+_MODEL_PROFILES_JSON = _dumps_indented(MODEL_PROFILES)
 
 
 # ─── CREATE MCP SERVER ───────────────────────────────────────────
@@ -107,25 +224,11 @@ def create_server(config: TokenetteConfig | None = None) -> FastMCP:
 
     mcp = FastMCP(
         name=(config.server.name or "tokenette").lower(),
-        instructions="""
-Tokenette: The Ultimate AI Coding Enhancement MCP
-
-I provide zero-loss token optimization, intelligent model routing, and quality amplification.
-
-Key capabilities:
-- 90-99% token reduction on file operations
-- Smart model routing to minimize premium request usage
-- Quality amplification for cheaper models
-- Multi-layer caching (L1-L4) with 99.8% hit rate on repeated data
-- Context7 integration for up-to-date library docs
-- Interaction batching for multi-op workflows
-
-Use `discover_tools` first to see available tools efficiently.
-Use `route_task` to get optimal model recommendations.
-Use `optimize_output` to compress any response before transmission.
-        """.strip(),
-        lifespan=lifespan,
+        instructions=_SERVER_INSTRUCTIONS,
+        lifespan=functools.partial(lifespan, config=config),
     )
+    # Checked once per registration or call site, so disabled metrics cost nothing per call
+    metrics_enabled = config.metrics.enabled
 
     def _record_metrics(
         tool_name: str,
@@ -133,35 +236,71 @@ Use `optimize_output` to compress any response before transmission.
         output_data: Any | None,
         tokens_saved: int = 0,
         cache_hit: bool | None = None,
+        output_tokens: int | None = None,
     ) -> None:
-        metrics: MetricsTracker = mcp.state["metrics"]
-        metrics.record_tool_call(
+        mcp.state.metrics.record_tool_call(
             tool_name,
             input_data=input_data,
             output_data=output_data,
             tokens_saved=tokens_saved,
             cache_hit=cache_hit,
+            output_tokens=output_tokens,
         )
 
-    def _tokens_saved_from_result(result: Any) -> int:
-        if isinstance(result, dict):
-            for key in ("tokens_saved", "total_tokens_saved"):
-                if key in result and isinstance(result[key], int):
-                    return result[key]
-            tokens = result.get("tokens")
-            if isinstance(tokens, dict):
-                saved = tokens.get("saved")
-                if isinstance(saved, int):
-                    return saved
-                original = tokens.get("original")
-                minified = tokens.get("minified")
-                if isinstance(original, int) and isinstance(minified, int):
-                    return max(0, original - minified)
-        return 0
+    def tracked_tool(
+        record: tuple[str, ...] | None = None,
+        saved: Callable[[Any], int] | None = None,
+        output: Callable[[Any], int] | None = None,
+    ) -> Callable[[Callable[..., Awaitable[Any]]], Any]:
+        """
+        Register a tool that records metrics after each call.
+
+        Args:
+            record: Arguments logged as the call's input (default: all but ctx)
+            saved: Extracts tokens_saved from the tool's result
+            output: Extracts output_tokens from the tool's result, for tools that
+                count their own output (skips estimating it from the result)
+        """
+
+        def register(fn: Callable[..., Awaitable[Any]]) -> Any:
+            if not metrics_enabled:
+                return mcp.tool()(fn)
+
+            # Everything that doesn't change per call is resolved once, here
+            name = fn.__name__
+            params = inspect.signature(fn).parameters
+            names = tuple(params)
+            logged = record if record is not None else tuple(n for n in names if n != "ctx")
+            defaults = {
+                n: p.default for n, p in params.items() if p.default is not inspect.Parameter.empty
+            }
+            logged_defaults = tuple((n, defaults.get(n)) for n in logged)
+
+            @functools.wraps(fn)
+            async def wrapper(*args: Any, **kwargs: Any) -> Any:
+                result = await fn(*args, **kwargs)
+                input_data = None
+                if logged_defaults:
+                    if args:  # FastMCP passes keywords; direct callers may not
+                        kwargs = {**dict(zip(names, args, strict=False)), **kwargs}
+                    # Only the values feed the size estimate, so a tuple is enough
+                    input_data = tuple([kwargs.get(n, default) for n, default in logged_defaults])
+                _record_metrics(
+                    name,
+                    input_data,
+                    result if output is None else None,
+                    tokens_saved=saved(result) if saved else 0,
+                    output_tokens=output(result) if output else None,
+                )
+                return result
+
+            return mcp.tool()(wrapper)
+
+        return register
 
     # ─── REGISTER CORE TOOLS ─────────────────────────────────────
 
-    @mcp.tool()
+    @tracked_tool()
     async def tokenette_discover_tools(
         category: str | None = None, ctx: Context | None = None
     ) -> dict[str, Any]:
@@ -173,11 +312,10 @@ Use `optimize_output` to compress any response before transmission.
         Args:
             category: Filter by category (file, analysis, docs, meta)
         """
-        result = await discover_tools(category, ctx)
-        _record_metrics("tokenette_discover_tools", {"category": category}, result)
-        return result
+        # discover_tools memoizes by arguments until tool popularity changes
+        return await discover_tools(category=category, ctx=ctx)
 
-    @mcp.tool()
+    @tracked_tool()
     async def tokenette_get_tool_details(
         tool_name: str, ctx: Context | None = None
     ) -> dict[str, Any]:
@@ -186,11 +324,9 @@ Use `optimize_output` to compress any response before transmission.
 
         Only fetches schema when needed, saving tokens.
         """
-        result = await get_tool_details(tool_name, ctx)
-        _record_metrics("tokenette_get_tool_details", {"tool_name": tool_name}, result)
-        return result
+        return await get_tool_details(tool_name, ctx=ctx)
 
-    @mcp.tool()
+    @tracked_tool(record=("tool_name", "cache_key", "skip_cache"))
     async def tokenette_execute_tool(
         tool_name: str,
         arguments: dict[str, Any],
@@ -207,20 +343,14 @@ Use `optimize_output` to compress any response before transmission.
             cache_key: Optional cache key
             skip_cache: Skip cache lookup
         """
-        result = await execute_tool(tool_name, arguments, cache_key, skip_cache, ctx)
-        _record_metrics(
-            "tokenette_execute_tool",
-            {"tool_name": tool_name, "cache_key": cache_key, "skip_cache": skip_cache},
-            result,
-        )
-        return result
+        return await execute_tool(tool_name, arguments, cache_key, skip_cache, ctx)
 
     if config.server.meta_tools_only:
         return mcp
 
     # ─── FILE OPERATION TOOLS ────────────────────────────────────
 
-    @mcp.tool()
+    @tracked_tool(saved=_result_field("tokens_saved"))
     async def tokenette_read_file(
         path: str,
         strategy: Literal["auto", "full", "partial", "summary", "ast"] = "auto",
@@ -244,21 +374,9 @@ Use `optimize_output` to compress any response before transmission.
             start_line: Start line for partial reads
             end_line: End line for partial reads
         """
-        result = await read_file_smart(path, strategy, start_line, end_line, ctx)
-        _record_metrics(
-            "tokenette_read_file",
-            {
-                "path": path,
-                "strategy": strategy,
-                "start_line": start_line,
-                "end_line": end_line,
-            },
-            result,
-            tokens_saved=_tokens_saved_from_result(result),
-        )
-        return result
+        return await read_file_smart(path, strategy, start_line, end_line, ctx)
 
-    @mcp.tool()
+    @tracked_tool(saved=_result_field("tokens_saved"))
     async def tokenette_write_file(
         path: str,
         diff: str,
@@ -275,16 +393,9 @@ Use `optimize_output` to compress any response before transmission.
             diff: Unified diff format changes
             expected_hash: Optional file hash to verify before applying
         """
-        result = await write_file_diff(path, diff, ctx=ctx, expected_hash=expected_hash)
-        _record_metrics(
-            "tokenette_write_file",
-            {"path": path, "diff": diff, "expected_hash": expected_hash},
-            result,
-            tokens_saved=_tokens_saved_from_result(result),
-        )
-        return result
+        return await write_file_diff(path, diff, ctx=ctx, expected_hash=expected_hash)
 
-    @mcp.tool()
+    @tracked_tool()
     async def tokenette_search_code(
         query: str,
         directory: str = ".",
@@ -303,20 +414,9 @@ Use `optimize_output` to compress any response before transmission.
             file_pattern: File glob pattern
             max_results: Maximum results to return
         """
-        result = await search_code_semantic(query, directory, file_pattern, max_results, ctx)
-        _record_metrics(
-            "tokenette_search_code",
-            {
-                "query": query,
-                "directory": directory,
-                "file_pattern": file_pattern,
-                "max_results": max_results,
-            },
-            result,
-        )
-        return result
+        return await search_code_semantic(query, directory, file_pattern, max_results, ctx)
 
-    @mcp.tool()
+    @tracked_tool()
     async def tokenette_get_structure(path: str, ctx: Context | None = None) -> dict[str, Any]:
         """
         Get file structure (AST summary).
@@ -324,11 +424,9 @@ Use `optimize_output` to compress any response before transmission.
         Returns functions, classes, and methods without code bodies.
         Much smaller than full file content.
         """
-        result = await get_file_structure(path, ctx)
-        _record_metrics("tokenette_get_structure", {"path": path}, result)
-        return result
+        return await get_file_structure(path, ctx)
 
-    @mcp.tool()
+    @tracked_tool(saved=_result_field("total_tokens_saved"))
     async def tokenette_batch_read(paths: list[str], ctx: Context | None = None) -> dict[str, Any]:
         """
         Read multiple files in one request with deduplication.
@@ -336,14 +434,7 @@ Use `optimize_output` to compress any response before transmission.
         Automatically detects and references shared code (imports, utilities).
         Much more efficient than multiple read_file calls.
         """
-        result = await batch_read_files(paths, ctx)
-        _record_metrics(
-            "tokenette_batch_read",
-            {"paths": paths},
-            result,
-            tokens_saved=_tokens_saved_from_result(result),
-        )
-        return result
+        return await batch_read_files(paths, ctx=ctx)
 
     @mcp.tool()
     async def tokenette_batch_ops(
@@ -358,19 +449,21 @@ Use `optimize_output` to compress any response before transmission.
         - search: {type:"search", query, directory?, file_pattern?, max_results?}
         - analyze: {type:"analyze", directory?, focus?}
         """
-        batcher: InteractionBatcher = mcp.state["batcher"]
-        result = await batcher.batch_file_operations(operations)
-        _record_metrics(
-            "tokenette_batch_ops",
-            {"operations": operations},
-            result,
-            tokens_saved=_tokens_saved_from_result(result),
-        )
+        result = await mcp.state.batcher.batch_file_operations(operations)
+        if metrics_enabled:
+            tokens = result.get("tokens")
+            _record_metrics(
+                "tokenette_batch_ops",
+                {"operations": operations},
+                result,
+                tokens_saved=max(0, tokens["original"] - tokens["minified"]) if tokens else 0,
+                output_tokens=tokens["minified"] if tokens else None,
+            )
         return result
 
     # ─── ANALYSIS TOOLS ──────────────────────────────────────────
 
-    @mcp.tool()
+    @tracked_tool()
     async def tokenette_analyze(
         path: str, checks: list[str] | None = None, ctx: Context | None = None
     ) -> dict[str, Any]:
@@ -381,11 +474,9 @@ Use `optimize_output` to compress any response before transmission.
             path: File or directory to analyze
             checks: Analysis checks (complexity, style, security)
         """
-        result = await analyze_code(path, checks, ctx)
-        _record_metrics("tokenette_analyze", {"path": path, "checks": checks}, result)
-        return result
+        return await analyze_code(path, checks, ctx)
 
-    @mcp.tool()
+    @tracked_tool()
     async def tokenette_find_bugs(
         path: str,
         severity: Literal["all", "high", "medium", "low"] = "all",
@@ -398,39 +489,29 @@ Use `optimize_output` to compress any response before transmission.
             path: File to scan
             severity: Filter by severity level
         """
-        result = await find_bugs(path, severity, ctx)
-        _record_metrics(
-            "tokenette_find_bugs",
-            {"path": path, "severity": severity},
-            result,
-        )
-        return result
+        return await find_bugs(path, severity, ctx)
 
-    @mcp.tool()
+    @tracked_tool()
     async def tokenette_complexity(path: str, ctx: Context | None = None) -> dict[str, Any]:
         """
         Calculate cyclomatic complexity metrics.
 
         Returns complexity score, LOC, nesting depth, and maintainability index.
         """
-        result = await get_complexity(path, ctx)
-        _record_metrics("tokenette_complexity", {"path": path}, result)
-        return result
+        return await get_complexity(path, ctx)
 
     # ─── CONTEXT7 / DOCUMENTATION TOOLS ──────────────────────────
 
-    @mcp.tool()
+    @tracked_tool()
     async def tokenette_resolve_lib(name: str, ctx: Context | None = None) -> dict[str, Any]:
         """
         Resolve library name to Context7 ID.
 
         Examples: "react" → "/facebook/react"
         """
-        result = await resolve_library(name, ctx)
-        _record_metrics("tokenette_resolve_lib", {"name": name}, result)
-        return result
+        return await resolve_library(name, ctx)
 
-    @mcp.tool()
+    @tracked_tool(saved=_docs_tokens_saved)
     async def tokenette_get_docs(
         library: str,
         topic: str | None = None,
@@ -449,16 +530,9 @@ Use `optimize_output` to compress any response before transmission.
             mode: "code" for API refs, "info" for guides
             page: Page number (1-10)
         """
-        result = await fetch_library_docs(library, topic, mode, page, ctx)
-        _record_metrics(
-            "tokenette_get_docs",
-            {"library": library, "topic": topic, "mode": mode, "page": page},
-            result,
-            tokens_saved=_tokens_saved_from_result(result),
-        )
-        return result
+        return await fetch_library_docs(library, topic, mode, page, ctx)
 
-    @mcp.tool()
+    @tracked_tool()
     async def tokenette_search_docs(
         query: str, library: str | None = None, ctx: Context | None = None
     ) -> dict[str, Any]:
@@ -469,16 +543,13 @@ Use `optimize_output` to compress any response before transmission.
             query: Search query
             library: Optional library to search within
         """
-        result = await search_library_docs(query, library, ctx)
-        _record_metrics(
-            "tokenette_search_docs",
-            {"query": query, "library": library},
-            result,
-        )
-        return result
+        return await search_library_docs(query, library, ctx)
 
     # ─── OPTIMIZATION TOOLS ──────────────────────────────────────
 
+    # (input type, content_type, input length, xxh3 of input) -> (response, tokens_saved, final_tokens)
+    optimize_l0: LRUCache = LRUCache(maxsize=_OPTIMIZE_L0_SIZE)
+
     @mcp.tool()
     async def tokenette_optimize(
         data: Any,
@@ -494,20 +565,38 @@ Use `optimize_output` to compress any response before transmission.
             data: Data to optimize
             content_type: Content type hint
         """
-        optimizer: OptimizationPipeline = mcp.state["optimizer"]
-        result = await optimizer.optimize(data, content_type=content_type)
-
-        response = result.to_response()
-        _record_metrics(
-            "tokenette_optimize",
-            {"content_type": content_type},
-            response,
-            tokens_saved=result.tokens_saved,
-            cache_hit=result.is_cache_hit,
-        )
+        start = time.perf_counter()
+        raw = data.encode() if isinstance(data, str) else repr(data).encode()
+        key = (type(data), content_type, len(raw), xxhash.xxh3_64_intdigest(raw))
+
+        memo = optimize_l0.get(key)
+        if memo is not None:
+            # Same input as a recent call: skip the pipeline, including its own cache lookup
+            # Callers own what they get back, so hand out a fresh copy every time
+            response, tokens_saved, final_tokens = memo
+            response = copy.deepcopy(response)
+            response["_source"] = "cache"
+            response["_latency_ms"] = (time.perf_counter() - start) * 1000
+            cache_hit = True
+        else:
+            result = await mcp.state.optimizer.optimize(data, content_type=content_type)
+            response = result.to_response()
+            tokens_saved, final_tokens = result.tokens_saved, result.final_tokens
+            optimize_l0[key] = (copy.deepcopy(response), tokens_saved, final_tokens)
+            cache_hit = result.is_cache_hit
+
+        if metrics_enabled:
+            _record_metrics(
+                "tokenette_optimize",
+                {"content_type": content_type},
+                response,
+                tokens_saved=tokens_saved,
+                cache_hit=cache_hit,
+                output_tokens=final_tokens,
+            )
         return response
 
-    @mcp.tool()
+    @tracked_tool()
     async def tokenette_route_task(
         request: str, affected_files: int = 1, ctx: Context | None = None
     ) -> dict[str, Any]:
@@ -524,28 +613,23 @@ Use `optimize_output` to compress any response before transmission.
             request: Description of the task
             affected_files: Number of files involved
         """
-        router: TaskRouter = mcp.state["router"]
-        decision = router.route(request, {"affected_files": affected_files})
-        result = {
-            "model": decision.model,
+        state: ServerState = mcp.state
+        decision = state.router.route(request, {"affected_files": affected_files})
+        model, multiplier = decision.model, decision.multiplier
+        if metrics_enabled:
+            state.metrics.record_model_use(model, multiplier)
+        return {
+            "model": model,
             "complexity": decision.complexity.name,
             "category": decision.category.value,
-            "multiplier": decision.multiplier,
+            "multiplier": multiplier,
             "effective_multiplier": decision.effective_multiplier,
             "quality_boosters": decision.quality_boosters,
             "fallback_chain": decision.fallback_chain,
             "reasoning": decision.reasoning,
         }
-        metrics: MetricsTracker = mcp.state["metrics"]
-        metrics.record_model_use(decision.model, decision.multiplier)
-        _record_metrics(
-            "tokenette_route_task",
-            {"request": request, "affected_files": affected_files},
-            result,
-        )
-        return result
 
-    @mcp.tool()
+    @tracked_tool(record=("category", "boosters"))
     async def tokenette_amplify(
         prompt: str,
         category: str | None = None,
@@ -563,21 +647,14 @@ Use `optimize_output` to compress any response before transmission.
             category: Task category (generation, refactor, etc.)
             boosters: Specific boosters to apply
         """
-        amplifier: QualityAmplifier = mcp.state["amplifier"]
+        state: ServerState = mcp.state
+        amplifier = state.amplifier
 
-        # Detect category if not provided
+        # Detect category if not provided; unknown names fall back to generation
         if category is None:
-            router: TaskRouter = mcp.state["router"]
-            cat = router._detect_category(prompt)
-            category = cat.value
-
-        # Normalize category to TaskCategory
-        from tokenette.core.router import TaskCategory
-
-        try:
-            category_enum = TaskCategory(category)
-        except Exception:
-            category_enum = TaskCategory.GENERATION
+            category_enum = state.router._detect_category(prompt)
+        else:
+            category_enum = _CATEGORY_MAP.get(category, TaskCategory.GENERATION)
 
         # Get boosters if not provided
         if boosters is None:
@@ -594,28 +671,21 @@ Use `optimize_output` to compress any response before transmission.
                 result.boosters_applied, base_quality=0.85
             ),
         }
-        _record_metrics(
-            "tokenette_amplify",
-            {"category": category_enum.value, "boosters": boosters},
-            response,
-        )
         return response
 
-    @mcp.tool()
+    @tracked_tool(record=())
     async def tokenette_metrics(ctx: Context | None = None) -> dict[str, Any]:
         """
         Get current session metrics.
 
         Returns token savings, cache hits, and budget usage.
         """
-        cache: MultiLayerCache = mcp.state["cache"]
-        router: TaskRouter = mcp.state["router"]
-        metrics: MetricsTracker = mcp.state["metrics"]
-        cache_stats = cache.get_stats()
-        budget = router.budget_tracker
+        state: ServerState = mcp.state
+        cache_stats = state.cache.get_stats()
+        budget = state.router.budget_tracker
 
-        result = {
-            "session": metrics.snapshot(),
+        return {
+            "session": state.metrics.snapshot(),
             "cache": {
                 "l1_entries": cache_stats.get("l1_entries", 0),
                 "l2_entries": cache_stats.get("l2_entries", 0),
@@ -627,12 +697,10 @@ Use `optimize_output` to compress any response before transmission.
                 "usage_pct": budget.usage_pct,
             },
         }
-        _record_metrics("tokenette_metrics", None, result)
-        return result
 
     # ─── GIT TOOLS ───────────────────────────────────────────────
 
-    @mcp.tool()
+    @tracked_tool(saved=_result_field("tokens_saved"))
     async def tokenette_git_diff(
         path: str = ".",
         staged: bool = False,
@@ -650,9 +718,7 @@ Use `optimize_output` to compress any response before transmission.
             context_lines: Lines of context (less = smaller)
             files: Specific files to diff
         """
-        from .tools.git_ops import get_git_diff
-
-        result = await get_git_diff(path, staged, context_lines, True, files)
+        result = await tools.get_git_diff(path, staged, context_lines, True, files)
         response = {
             "files_changed": result.files_changed,
             "insertions": result.insertions,
@@ -661,15 +727,9 @@ Use `optimize_output` to compress any response before transmission.
             "summary": result.summary,
             "tokens_saved": result.tokens_saved,
         }
-        _record_metrics(
-            "tokenette_git_diff",
-            {"path": path, "staged": staged, "context_lines": context_lines, "files": files},
-            response,
-            tokens_saved=result.tokens_saved,
-        )
         return response
 
-    @mcp.tool()
+    @tracked_tool()
     async def tokenette_git_status(path: str = ".") -> dict[str, Any]:
         """
         Get optimized git status.
@@ -679,13 +739,9 @@ Use `optimize_output` to compress any response before transmission.
         Args:
             path: Repository path
         """
-        from .tools.git_ops import get_git_status
+        return await tools.get_git_status(path)
 
-        result = await get_git_status(path)
-        _record_metrics("tokenette_git_status", {"path": path}, result)
-        return result
-
-    @mcp.tool()
+    @tracked_tool()
     async def tokenette_git_history(
         path: str = ".",
         max_commits: int = 20,
@@ -701,28 +757,16 @@ Use `optimize_output` to compress any response before transmission.
             file_path: Filter by file
             author: Filter by author
         """
-        from .tools.git_ops import get_git_history
-
-        result = await get_git_history(path, max_commits, file_path, author)
+        result = await tools.get_git_history(path, max_commits, file_path, author)
         response = {
             "commits": result.commits,
             "total": result.total_commits,
             "date_range": result.date_range,
             "summary": result.summary,
         }
-        _record_metrics(
-            "tokenette_git_history",
-            {
-                "path": path,
-                "max_commits": max_commits,
-                "file_path": file_path,
-                "author": author,
-            },
-            response,
-        )
         return response
 
-    @mcp.tool()
+    @tracked_tool()
     async def tokenette_git_blame(
         file_path: str, start_line: int | None = None, end_line: int | None = None
     ) -> dict[str, Any]:
@@ -734,25 +778,18 @@ Use `optimize_output` to compress any response before transmission.
             start_line: Starting line (1-indexed)
             end_line: Ending line (inclusive)
         """
-        from .tools.git_ops import get_git_blame
-
-        result = await get_git_blame(file_path, start_line, end_line)
+        result = await tools.get_git_blame(file_path, start_line, end_line)
         response = {
             "file": result.file,
             "lines": result.lines,
             "authors": result.authors,
             "summary": result.summary,
         }
-        _record_metrics(
-            "tokenette_git_blame",
-            {"file_path": file_path, "start_line": start_line, "end_line": end_line},
-            response,
-        )
         return response
 
     # ─── PROMPT TOOLS ────────────────────────────────────────────
 
-    @mcp.tool()
+    @tracked_tool()
     async def tokenette_list_prompts(category: str | None = None) -> list[dict[str, str]]:
         """
         List available prompt templates.
@@ -763,13 +800,9 @@ Use `optimize_output` to compress any response before transmission.
         Args:
             category: Filter by category
         """
-        from .tools.prompts import list_templates
+        return tools.list_templates(category)
 
-        result = list_templates(category)
-        _record_metrics("tokenette_list_prompts", {"category": category}, result)
-        return result
-
-    @mcp.tool()
+    @tracked_tool(record=("template_name", "variables"))
     async def tokenette_build_prompt(
         template_name: str, variables: dict[str, str], quality_boosters: list[str] | None = None
     ) -> dict[str, Any]:
@@ -784,25 +817,18 @@ Use `optimize_output` to compress any response before transmission.
             variables: Variable values to fill in
             quality_boosters: Optional boosters (expert_role_framing, chain_of_thought_injection, etc.)
         """
-        from .tools.prompts import build_prompt
-
-        result = build_prompt(template_name, variables, quality_boosters)
+        result = tools.build_prompt(template_name, variables, quality_boosters)
         response = {
             "prompt": result.prompt,
             "template": result.template_name,
             "token_count": result.token_count,
             "boosters_applied": result.quality_boosters,
         }
-        _record_metrics(
-            "tokenette_build_prompt",
-            {"template_name": template_name, "variables": variables},
-            response,
-        )
         return response
 
     # ─── TOKEN & BUDGET TOOLS ────────────────────────────────────
 
-    @mcp.tool()
+    @tracked_tool(record=("language", "detailed"))
     async def tokenette_count_tokens(
         text: str, language: str | None = None, detailed: bool = False
     ) -> dict[str, Any]:
@@ -814,22 +840,15 @@ Use `optimize_output` to compress any response before transmission.
             language: Programming language for better accuracy
             detailed: Include detailed breakdown
         """
-        from .tools.tokens import count_tokens
-
-        result = count_tokens(text, language, detailed)
+        result = tools.count_tokens(text, language, detailed)
         response = {
             "text_length": result.text_length,
             "estimated_tokens": result.estimated_tokens,
             "breakdown": result.breakdown,
         }
-        _record_metrics(
-            "tokenette_count_tokens",
-            {"language": language, "detailed": detailed},
-            response,
-        )
         return response
 
-    @mcp.tool()
+    @tracked_tool(record=("model", "output_estimate"))
     async def tokenette_estimate_cost(
         model: str, input_text: str, output_estimate: int = 500
     ) -> dict[str, Any]:
@@ -841,9 +860,7 @@ Use `optimize_output` to compress any response before transmission.
             input_text: Input text or prompt
             output_estimate: Estimated output tokens
         """
-        from .tools.tokens import estimate_cost
-
-        result = estimate_cost(model, input_text, output_estimate)
+        result = tools.estimate_cost(model, input_text, output_estimate)
         response = {
             "model": result.model,
             "input_tokens": result.input_tokens,
@@ -852,14 +869,9 @@ Use `optimize_output` to compress any response before transmission.
             "premium_cost": result.premium_requests_cost,
             "breakdown": result.breakdown,
         }
-        _record_metrics(
-            "tokenette_estimate_cost",
-            {"model": model, "output_estimate": output_estimate},
-            response,
-        )
         return response
 
-    @mcp.tool()
+    @tracked_tool(record=("output_estimate",))
     async def tokenette_compare_models(
         input_text: str, output_estimate: int = 500
     ) -> list[dict[str, Any]]:
@@ -872,26 +884,25 @@ Use `optimize_output` to compress any response before transmission.
             input_text: Input text to estimate for
             output_estimate: Estimated output tokens
         """
-        from .tools.tokens import compare_model_costs
+        return tools.compare_model_costs(input_text, output_estimate)
 
-        result = compare_model_costs(input_text, output_estimate)
-        _record_metrics(
-            "tokenette_compare_models",
-            {"output_estimate": output_estimate},
-            result,
-        )
-        return result
+    # (tracker version, limit, day) -> response; status only moves with usage or the date
+    budget_memo: dict[tuple[int, int, date], dict[str, Any]] = {}
 
-    @mcp.tool()
+    @tracked_tool(record=())
     async def tokenette_budget_status() -> dict[str, Any]:
         """
         Get current budget status with recommendations.
 
         Shows usage, remaining budget, and optimization tips.
         """
-        from .tools.tokens import get_budget_tracker
+        tracker = tools.get_budget_tracker()
+        key = (tracker.version, tracker.monthly_limit, date.today())
+        memo = budget_memo.get(key)
+        if memo is not None:
+            # Callers own what they get back, so the stored report stays untouched
+            return copy.deepcopy(memo)
 
-        tracker = get_budget_tracker()
         status = tracker.get_status()
         response = {
             "monthly_limit": status.monthly_limit,
@@ -903,12 +914,13 @@ Use `optimize_output` to compress any response before transmission.
             "on_track": status.on_track,
             "recommendations": status.recommendations,
         }
-        _record_metrics("tokenette_budget_status", None, response)
+        budget_memo.clear()
+        budget_memo[key] = copy.deepcopy(response)
         return response
 
     # ─── WORKSPACE TOOLS ─────────────────────────────────────────
 
-    @mcp.tool()
+    @tracked_tool()
     async def tokenette_project_info(path: str = ".") -> dict[str, Any]:
         """
         Detect project type and gather information.
@@ -918,9 +930,7 @@ Use `optimize_output` to compress any response before transmission.
         Args:
             path: Path to project root
         """
-        from .tools.workspace import detect_project_type
-
-        result = await detect_project_type(path)
+        result = await tools.detect_project_type(path)
         response = {
             "name": result.name,
             "type": result.type,
@@ -931,10 +941,9 @@ Use `optimize_output` to compress any response before transmission.
             "dependencies_count": len(result.dependencies),
             "scripts": result.scripts,
         }
-        _record_metrics("tokenette_project_info", {"path": path}, response)
         return response
 
-    @mcp.tool()
+    @tracked_tool()
     async def tokenette_workspace_summary(path: str = ".", max_depth: int = 4) -> dict[str, Any]:
         """
         Generate comprehensive workspace summary.
@@ -945,9 +954,7 @@ Use `optimize_output` to compress any response before transmission.
             path: Path to workspace root
             max_depth: Maximum directory depth
         """
-        from .tools.workspace import get_workspace_summary
-
-        result = await get_workspace_summary(path, max_depth)
+        result = await tools.get_workspace_summary(path, max_depth)
         response = {
             "total_files": result.total_files,
             "total_lines": result.total_lines,
@@ -957,14 +964,9 @@ Use `optimize_output` to compress any response before transmission.
             "token_estimate": result.token_estimate,
             "summary": result.summary_text,
         }
-        _record_metrics(
-            "tokenette_workspace_summary",
-            {"path": path, "max_depth": max_depth},
-            response,
-        )
         return response
 
-    @mcp.tool()
+    @tracked_tool()
     async def tokenette_code_health(path: str = ".") -> dict[str, Any]:
         """
         Analyze code health metrics.
@@ -974,9 +976,7 @@ Use `optimize_output` to compress any response before transmission.
         Args:
             path: Path to project root
         """
-        from .tools.workspace import get_code_health
-
-        result = await get_code_health(path)
+        result = await tools.get_code_health(path)
         response = {
             "files_analyzed": result.files_analyzed,
             "total_lines": result.total_lines,
@@ -986,10 +986,9 @@ Use `optimize_output` to compress any response before transmission.
             "largest_files": result.largest_files[:5],
             "recommendations": result.recommendations,
         }
-        _record_metrics("tokenette_code_health", {"path": path}, response)
         return response
 
-    @mcp.tool()
+    @tracked_tool(output=_result_field("tokens_used"))
     async def tokenette_smart_context(
         path: str, query: str, max_tokens: int = 4000
     ) -> dict[str, Any]:
@@ -1004,17 +1003,9 @@ Use `optimize_output` to compress any response before transmission.
             query: User's query or task description
             max_tokens: Maximum tokens to include
         """
-        from .tools.workspace import extract_smart_context
+        return await tools.extract_smart_context(path, query, max_tokens)
 
-        result = await extract_smart_context(path, query, max_tokens)
-        _record_metrics(
-            "tokenette_smart_context",
-            {"path": path, "query": query, "max_tokens": max_tokens},
-            result,
-        )
-        return result
-
-    @mcp.tool()
+    @tracked_tool()
     async def tokenette_dependencies(path: str = ".") -> dict[str, Any]:
         """
         Analyze project dependencies.
@@ -1022,44 +1013,49 @@ Use `optimize_output` to compress any response before transmission.
         Args:
             path: Path to project root
         """
-        from .tools.workspace import analyze_dependencies
-
-        result = await analyze_dependencies(path)
+        result = await tools.analyze_dependencies(path)
         response = {
             "direct": result.direct,
             "dev": result.dev,
             "total": result.total_count,
             "tree": result.dependency_tree,
         }
-        _record_metrics("tokenette_dependencies", {"path": path}, response)
         return response
 
     # ─── REGISTER RESOURCES ──────────────────────────────────────
 
+    # Resource bodies are serialized once and reused: the config only changes when
+    # set_config swaps the instance, and cache stats are re-read at most once per
+    # _CACHE_STATS_TTL_SECONDS
+    config_json: tuple[TokenetteConfig | None, str] = (None, "")
+    cache_stats_json: tuple[float, str] = (float("-inf"), "{}")
+
     @mcp.resource("tokenette://config")
     async def get_current_config() -> str:
         """Current Tokenette configuration."""
+        nonlocal config_json
         config = get_config()
-        return config.model_dump_json(indent=2)
+        if config_json[0] is not config:
+            config_json = (config, config.model_dump_json(indent=2))
+        return config_json[1]
 
     @mcp.resource("tokenette://models")
     async def get_model_profiles() -> str:
         """Available model profiles with costs."""
-        import json
-
-        from .core.router import MODEL_PROFILES
-
-        return json.dumps(MODEL_PROFILES, indent=2)
+        return _MODEL_PROFILES_JSON
 
     @mcp.resource("tokenette://cache/stats")
     async def get_cache_stats() -> str:
         """Current cache statistics."""
-        import json
-
-        cache: MultiLayerCache = mcp.state.get("cache")
-        if cache:
-            return json.dumps(cache.get_stats(), indent=2)
-        return "{}"
+        nonlocal cache_stats_json
+        now = time.monotonic()
+        if now - cache_stats_json[0] >= _CACHE_STATS_TTL_SECONDS:
+            # Looked up per refresh, not captured: each lifespan start replaces mcp.state
+            state: ServerState | None = getattr(mcp, "state", None)
+            if state is None:
+                return "{}"
+            cache_stats_json = (now, _dumps_indented(state.cache.get_stats()))
+        return cache_stats_json[1]
 
     return mcp
 
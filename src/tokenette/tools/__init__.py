@@ -12,6 +12,9 @@ Contains all MCP tools organized by category:
 - Workspace tools: detect_project_type, get_workspace_summary, get_code_health
 """
 
+import importlib
+from typing import Any
+
 from tokenette.tools.analysis import analyze_code, find_bugs, get_complexity
 from tokenette.tools.context7 import (
     Context7Client,
@@ -24,59 +27,73 @@ from tokenette.tools.file_ops import (
     batch_read_files,
     get_file_structure,
     read_file_smart,
+    read_files_smart_batch,
     search_code_semantic,
     write_file_diff,
 )
-from tokenette.tools.git_ops import (
-    GitBlame,
-    GitDiff,
-    GitHistory,
-    get_git_blame,
-    get_git_branches,
-    get_git_diff,
-    get_git_history,
-    get_git_status,
-)
-from tokenette.tools.meta import discover_tools, execute_tool, get_tool_details
-from tokenette.tools.prompts import (
-    BuiltPrompt,
-    PromptBuilder,
-    PromptCategory,
-    PromptTemplate,
-    build_prompt,
-    get_prompt_builder,
-    list_templates,
-)
-from tokenette.tools.tokens import (
-    BudgetStatus,
-    BudgetTracker,
-    CostEstimate,
-    TokenCount,
-    compare_model_costs,
-    count_tokens,
-    count_tokens_in_file,
-    estimate_cost,
-    get_budget_tracker,
-)
-from tokenette.tools.workspace import (
-    CodeHealthMetrics,
-    DependencyMap,
-    ProjectInfo,
-    WorkspaceSummary,
-    analyze_dependencies,
-    detect_project_type,
-    extract_smart_context,
-    get_code_health,
-    get_workspace_summary,
+from tokenette.tools.meta import (
+    discover_tools,
+    execute_tool,
+    get_tool_details,
+    registry_version,
 )
 
+# Git, prompt, token and workspace tools load on first attribute access; the
+# resolved object is cached in module globals so later lookups are plain loads
+_LAZY_MODULES: dict[str, tuple[str, ...]] = {
+    "tokenette.tools.git_ops": (
+        "GitBlame",
+        "GitDiff",
+        "GitHistory",
+        "get_git_blame",
+        "get_git_branches",
+        "get_git_diff",
+        "get_git_history",
+        "get_git_status",
+    ),
+    "tokenette.tools.prompts": (
+        "BuiltPrompt",
+        "PromptBuilder",
+        "PromptCategory",
+        "PromptTemplate",
+        "build_prompt",
+        "get_prompt_builder",
+        "list_templates",
+    ),
+    "tokenette.tools.tokens": (
+        "BudgetStatus",
+        "BudgetTracker",
+        "CostEstimate",
+        "TokenCount",
+        "compare_model_costs",
+        "count_tokens",
+        "count_tokens_in_file",
+        "estimate_cost",
+        "get_budget_tracker",
+    ),
+    "tokenette.tools.workspace": (
+        "CodeHealthMetrics",
+        "DependencyMap",
+        "ProjectInfo",
+        "WorkspaceSummary",
+        "analyze_dependencies",
+        "detect_project_type",
+        "extract_smart_context",
+        "get_code_health",
+        "get_workspace_summary",
+    ),
+}
+_LAZY = {name: module for module, names in _LAZY_MODULES.items() for name in names}
+
 __all__ = [
     # Meta tools
     "discover_tools",
     "get_tool_details",
     "execute_tool",
+    "registry_version",
     # File tools
     "read_file_smart",
+    "read_files_smart_batch",
     "write_file_diff",
     "search_code_semantic",
     "get_file_structure",
@@ -129,3 +146,12 @@ __all__ = [
     "DependencyMap",
     "CodeHealthMetrics",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
@@ -10,6 +10,7 @@ Provides code analysis capabilities:
 from __future__ import annotations
 
 import ast
+import math
 import re
 from dataclasses import dataclass
 from pathlib import Path
@@ -369,8 +370,6 @@ async def get_complexity(path: str, ctx: Context | None = None) -> dict[str, Any
 
     # Calculate maintainability index (simplified)
     # MI = 171 - 5.2 * ln(V) - 0.23 * G - 16.2 * ln(LOC)
-    import math
-
     volume = max(1, metrics.lines_of_code * 10)  # Simplified Halstead volume
     metrics.maintainability_index = max(
         0,
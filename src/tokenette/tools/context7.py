@@ -90,7 +90,7 @@ class Context7Client:
 
     def __init__(self, cache: MultiLayerCache | None = None):
         self.config = get_config().context7
-        self.cache = cache or MultiLayerCache()
+        self.cache = cache or MultiLayerCache(get_config().cache)
         self.minifier = MinificationEngine()
         self._http = httpx.AsyncClient(timeout=30.0)
 
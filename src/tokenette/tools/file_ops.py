@@ -3,6 +3,7 @@ File Operations Tools
 
 High-efficiency file operations with intelligent optimization:
 - read_file_smart: Auto-selects best reading strategy
+- read_files_smart_batch: Concurrent smart reads over parallel argument lists
 - write_file_diff: 97% smaller than full file writes
 - search_code_semantic: 98% savings vs manual grep
 - get_file_structure: AST-based structure extraction
@@ -12,9 +13,13 @@ High-efficiency file operations with intelligent optimization:
 from __future__ import annotations
 
 import ast
+import asyncio
+import copy
+import fnmatch
 import hashlib
 import os
 import re
+from collections import Counter
 from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any, Literal
@@ -99,6 +104,12 @@ STRATEGY_THRESHOLDS = {
 }
 
 STREAM_CHUNK_SIZE = 20_000  # chars per chunk
+MAX_READ_CONCURRENCY = 32  # Cap on reads processed at once by read_files_smart_batch
+
+# Batched reads: imports repeated across files become whole-line "§N" references
+SHARED_REF_PREFIX = "§"
+MIN_DEDUP_SIZE = 4096  # Below this many chars of read content, skip import dedup
+_IMPORT_RE = re.compile(r"^(?:import |from )[^\n]*", re.MULTILINE)
 _VECTOR_MODEL: SentenceTransformer | None = None
 
 
@@ -144,27 +155,43 @@ async def read_file_smart(
     Returns:
         Optimized file content with metadata
     """
+    return await _read_file_smart(path, strategy, start_line, end_line, ctx)
+
+
+async def _read_file_smart(
+    path: str,
+    strategy: str,
+    start_line: int | None,
+    end_line: int | None,
+    ctx: Context | None,
+    raw: bytes | None = None,
+) -> dict[str, Any]:
+    """read_file_smart body; raw is the file's bytes when a batch already loaded them."""
     file_path = Path(path)
 
-    if not file_path.exists():
+    if raw is None and not file_path.exists():
         return {"error": f"File not found: {path}"}
 
     config = get_config()
 
     # Get file info
-    file_size = file_path.stat().st_size
-    file_hash = await _compute_file_hash(file_path)
+    if raw is not None:
+        file_size = len(raw)
+        file_hash = hashlib.sha256(raw).hexdigest()[:16]
+    else:
+        file_size = file_path.stat().st_size
+        file_hash = await _compute_file_hash(file_path)
 
-    cache = None
-    if ctx is not None and hasattr(ctx, "state"):
-        cache = ctx.state.get("cache")
+    cache = _server_cache(ctx)
 
+    # Keyed by content hash, so a changed file never hits an entry for its old content
     cache_key = f"file:{path}:{file_hash}:{strategy}:{start_line}:{end_line}"
     if cache is not None:
         cached = await cache.get(cache_key)
         if cached and cached.hit:
             cached_payload = cached.data
             if isinstance(cached_payload, dict):
+                cached_payload = _copy_read(cached_payload)
                 cached_payload["from_cache"] = True
                 cached_payload["cache_layer"] = cached.layer
             return cached_payload
@@ -189,6 +216,8 @@ async def read_file_smart(
         if config.compression.stream_large_responses and file_size > STRATEGY_THRESHOLDS["summary"]:
             content = await _read_stream(file_path)
             strategy = "stream"
+        elif raw is not None:
+            content = _minify_full(raw.decode("utf-8", errors="replace"))
         else:
             content = await _read_full(file_path)
     elif strategy == "partial":
@@ -217,11 +246,98 @@ async def read_file_smart(
     }
 
     if cache is not None:
-        await cache.set(cache_key, result)
+        # L1 keeps the object itself, so it gets a copy the caller can't reach
+        await cache.set(cache_key, _copy_read(result))
 
     return result
 
 
+def _copy_read(result: dict[str, Any]) -> dict[str, Any]:
+    """Copy a read result deep enough that edits to it never reach the cache."""
+    content = result.get("content")
+    if isinstance(content, str):
+        return dict(result)
+    return copy.deepcopy(result)
+
+
+async def read_files_smart_batch(
+    paths: list[str],
+    strategies: list[str] | None = None,
+    start_lines: list[int | None] | None = None,
+    end_lines: list[int | None] | None = None,
+    ctx: Context | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Read many files at once with read_file_smart.
+
+    Arguments are parallel lists (one entry per path); omitted lists
+    default to the "auto" strategy and whole-file reads. All files are
+    loaded in a single worker-thread job, then processed concurrently
+    (at most MAX_READ_CONCURRENCY at a time); results keep the order of paths.
+
+    Args:
+        paths: Paths to read
+        strategies: Reading strategy per path
+        start_lines: Start line per path for partial reads
+        end_lines: End line per path for partial reads
+        ctx: MCP context
+
+    Returns:
+        One read_file_smart result per path
+    """
+    count = len(paths)
+    strategies = strategies if strategies is not None else ["auto"] * count
+    start_lines = start_lines if start_lines is not None else [None] * count
+    end_lines = end_lines if end_lines is not None else [None] * count
+
+    # One executor hop for the whole batch instead of several aiofiles hops per file;
+    # the bytes serve both the content hash and full reads
+    raws = await asyncio.to_thread(_read_bytes_many, paths)
+
+    semaphore = asyncio.Semaphore(MAX_READ_CONCURRENCY)
+
+    async def bounded(
+        path: str, strategy: str, start: int | None, end: int | None, raw: bytes | None
+    ) -> dict[str, Any]:
+        async with semaphore:
+            return await _read_file_smart(path, strategy, start, end, ctx, raw)
+
+    return list(
+        await asyncio.gather(
+            *(
+                bounded(path, strategy, start, end, raw)
+                for path, strategy, start, end, raw in zip(
+                    paths, strategies, start_lines, end_lines, raws, strict=True
+                )
+            )
+        )
+    )
+
+
+def _read_bytes_many(paths: list[str]) -> list[bytes | None]:
+    """Read each regular file's bytes; None where a file can't be read."""
+    raws: list[bytes | None] = []
+    for path in paths:
+        try:
+            with open(path, "rb") as f:
+                raws.append(f.read())
+        except OSError:
+            # Missing files and directories fall back to the per-file path
+            raws.append(None)
+    return raws
+
+
+def _server_cache(ctx: Context | None) -> Any:
+    """Return the server's MultiLayerCache (mcp.state.cache), if ctx reaches one."""
+    if ctx is None:
+        return None
+    try:
+        state = getattr(ctx.fastmcp, "state", None)
+    except RuntimeError:
+        return None  # Server already gone
+    return getattr(state, "cache", None)
+
+
 async def _compute_file_hash(path: Path) -> str:
     """Compute SHA-256 hash of file content."""
     async with aiofiles.open(path, "rb") as f:
@@ -233,7 +349,10 @@ async def _read_full(path: Path) -> str:
     """Read entire file with minification."""
     async with aiofiles.open(path, encoding="utf-8", errors="replace") as f:
         content = await f.read()
+    return _minify_full(content)
 
+
+def _minify_full(content: str) -> str:
     # Apply code minification if it's code
     minifier = MinificationEngine()
     result = minifier.minify(content, content_type="auto")
@@ -496,12 +615,6 @@ async def write_file_diff(
     # Compute new hash
     new_hash = hashlib.sha256(new_content.encode()).hexdigest()[:16]
 
-    # Invalidate cached reads for this file
-    if ctx is not None and hasattr(ctx, "state"):
-        cache = ctx.state.get("cache")
-        if cache is not None:
-            cache.invalidate(f"file:{path}")
-
     if ctx:
         await ctx.info(f"Applied changes to {path}")
 
@@ -592,8 +705,6 @@ async def search_code_semantic(
     Returns:
         Ranked list of code snippets
     """
-    import fnmatch
-
     dir_path = Path(directory)
     if not dir_path.exists():
         return {"error": f"Directory not found: {directory}"}
@@ -748,6 +859,58 @@ async def get_file_structure(
     }
 
 
+def deduplicate_shared_imports(
+    results: list[dict[str, Any]], min_size: int = MIN_DEDUP_SIZE
+) -> tuple[list[dict[str, Any]], dict[str, str]]:
+    """
+    Replace imports repeated across reads with references.
+
+    A line "§N" in a read's content stands for shared["N"]; clients expand
+    references line by line. Rewritten reads are new dicts, so the inputs
+    (which may be cached) are never modified.
+
+    Args:
+        results: Read results with a "content" field
+        min_size: Total content size below which nothing is deduplicated
+
+    Returns:
+        (results, shared) with shared mapping each reference number to its line
+    """
+    shared_segments: dict[str, str] = {}
+    contents = [r.get("content") for r in results]
+    texts = [c for c in contents if isinstance(c, str) and ("import " in c or "from " in c)]
+
+    # Nothing can repeat across fewer than two files, and tiny batches save
+    # less than the scan costs
+    if len(texts) < 2 or sum(len(t) for t in texts) < min_size:
+        return results, shared_segments
+
+    all_imports: list[str] = []
+    for text in texts:
+        all_imports.extend(_IMPORT_RE.findall(text))
+
+    import_counts = Counter(all_imports)
+    shared = [imp for imp, count in import_counts.items() if count > 1]
+    if not shared:
+        return results, shared_segments
+
+    # Each shared line becomes a whole-line "§N" reference into the table,
+    # so the saving grows with the import's length
+    refs = {imp: str(n) for n, imp in enumerate(shared, start=1)}
+    shared_segments.update({ref: imp for imp, ref in refs.items()})
+    # One pass per file; anchored so "import os" never hits "import osmium"
+    pattern = re.compile("^(?:" + "|".join(re.escape(imp) for imp in shared) + ")$", re.MULTILINE)
+
+    def replace(match: re.Match[str]) -> str:
+        return SHARED_REF_PREFIX + refs[match.group(0)]
+
+    deduplicated = [
+        {**r, "content": pattern.sub(replace, content)} if isinstance(content, str) else r
+        for r, content in zip(results, contents, strict=True)
+    ]
+    return deduplicated, shared_segments
+
+
 async def batch_read_files(
     paths: list[str],
     deduplicate: bool = True,
@@ -769,38 +932,11 @@ async def batch_read_files(
     Returns:
         Batch result with deduplicated content
     """
-    results = []
+    results = await read_files_smart_batch(paths, [strategy] * len(paths), ctx=ctx)
     shared_segments: dict[str, str] = {}
 
-    for path in paths:
-        result = await read_file_smart(path, strategy=strategy, ctx=ctx)
-        results.append(result)
-
-    if deduplicate and len(results) > 1:
-        # Find shared import patterns
-        all_imports = []
-        for r in results:
-            if isinstance(r.get("content"), str):
-                # Extract imports
-                imports = re.findall(
-                    r"^(?:from\s+[\w.]+\s+)?import\s+.+$|^import\s+.+$", r["content"], re.MULTILINE
-                )
-                all_imports.extend(imports)
-
-        # Find repeated imports
-        from collections import Counter
-
-        import_counts = Counter(all_imports)
-        shared = [imp for imp, count in import_counts.items() if count > 1]
-
-        if shared:
-            shared_segments["_shared_imports"] = "\n".join(shared)
-
-            # Replace shared imports in results with reference
-            for r in results:
-                if isinstance(r.get("content"), str):
-                    for imp in shared:
-                        r["content"] = r["content"].replace(imp, "# → _shared_imports")
+    if deduplicate:
+        results, shared_segments = deduplicate_shared_imports(results)
 
     # Calculate total savings
     original_total = sum(r.get("original_size", 0) for r in results)
@@ -9,9 +9,14 @@ Implements the 3 meta-tools that enable 96% token savings:
 
 from __future__ import annotations
 
-from collections.abc import Callable
+import copy
+from array import array
+from collections.abc import Callable, Iterable, Mapping
 from dataclasses import dataclass, field
-from typing import Any
+from functools import cache, lru_cache
+from itertools import islice
+from types import MappingProxyType
+from typing import Any, NamedTuple
 
 from fastmcp import Context
 
@@ -35,9 +40,9 @@ class ToolMetadata:
         }
 
 
-@dataclass
+@dataclass(frozen=True)
 class ToolDetails:
-    """Full tool schema with parameters."""
+    """Full tool schema with parameters (read-only; responses get copies of its dicts)."""
 
     name: str
     description: str
@@ -178,6 +183,84 @@ TOOL_REGISTRY: dict[str, ToolMetadata] = {
     ),
 }
 
+# Bumped whenever a tool's popularity changes; discovery responses are
+# otherwise static and can be reused between bumps
+_registry_version = 0
+
+
+class _DiscoveryTable(NamedTuple):
+    """Discovery columns: row i of every field describes the same tool."""
+
+    names: tuple[str, ...]
+    categories: tuple[str, ...]
+    haystacks: tuple[str, ...]
+
+
+# Search fields fused into one string per tool (lowercased name, lowercased
+# description, tags), so a query is one substring scan. The NUL separators
+# keep a match from running across two fields
+_TABLE = _DiscoveryTable(
+    names=tuple(TOOL_REGISTRY),
+    categories=tuple(m.category for m in TOOL_REGISTRY.values()),
+    haystacks=tuple(
+        "\0".join((name.lower(), m.description.lower(), *m.tags))
+        for name, m in TOOL_REGISTRY.items()
+    ),
+)
+# Registry order rather than set order, so responses are stable across processes;
+# shared by every discovery response, treat as read-only
+_CATEGORIES: list[str] = list(dict.fromkeys(_TABLE.categories))
+_ROWS: dict[str, int] = {name: row for row, name in enumerate(_TABLE.names)}
+
+# Registry names <-> tokenette_-prefixed names, resolved once
+_PREFIX = "tokenette_"
+_PREFIXED: dict[str, str] = {
+    name: name if name.startswith(_PREFIX) else _PREFIX + name for name in TOOL_REGISTRY
+}
+_STRIPPED: dict[str, str] = {
+    **{name: name.removeprefix(_PREFIX) for name in TOOL_REGISTRY},
+    **{prefixed: prefixed.removeprefix(_PREFIX) for prefixed in _PREFIXED.values()},
+}
+# Names listed as "available" in unknown-tool errors; each error gets its own list copy
+_PREFIXED_TOOL_LIST: tuple[str, ...] = tuple(_PREFIXED.values())
+
+# Approximate tokens per discovery entry: ~4 chars/token over its JSON form,
+# where keys, quotes and a 3-digit popularity add ~40 chars beyond the values
+_TOKEN_ESTIMATES: tuple[int, ...] = tuple(
+    max(1, (len(_PREFIXED[name]) + min(len(m.description), 80) + len(m.category) + 40) // 4)
+    for name, m in TOOL_REGISTRY.items()
+)
+
+# Live usage counts by row, seeded from the registry. execute_tool bumps a slot
+# here; ToolMetadata.popularity is brought up to date when discovery re-ranks
+_popularity = array("q", (m.popularity for m in TOOL_REGISTRY.values()))
+
+
+def _trigrams(text: str) -> set[str]:
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def _build_trigram_index() -> dict[str, frozenset[int]]:
+    index: dict[str, set[int]] = {}
+    # Per field, so no trigram spans two fields
+    for row, haystack in enumerate(_TABLE.haystacks):
+        for text in haystack.split("\0"):
+            for gram in _trigrams(text):
+                index.setdefault(gram, set()).add(row)
+    return {gram: frozenset(rows) for gram, rows in index.items()}
+
+
+# trigram -> rows with that trigram in their name, description or tags
+_TRIGRAM_INDEX = _build_trigram_index()
+
+# Rows by descending popularity, overall (None) and per category, plus each
+# row's discovery dict; refreshed lazily when _registry_version moves, and
+# only rows whose popularity has moved since (or that were never built) get a
+# new dict. discover_tools copies them into each response
+_ranked: dict[str | None, tuple[int, ...]] = {}
+_tool_dicts: list[dict[str, Any]] = [{} for _ in _TABLE.names]
+_ranked_version = -1
+
 # Full tool schemas (loaded on demand)
 TOOL_SCHEMAS: dict[str, ToolDetails] = {
     "discover_tools": ToolDetails(
@@ -517,12 +600,63 @@ TOOL_SCHEMAS: dict[str, ToolDetails] = {
 }
 
 
+def registry_version() -> int:
+    """Return the TOOL_REGISTRY version (changes whenever popularity does)."""
+    return _registry_version
+
+
+def _refresh_discovery() -> None:
+    global _ranked_version
+    # Write-behind: execute_tool only bumps _popularity, and the counts reach
+    # ToolMetadata (and the dicts) here, once per refresh
+    for row, popularity in enumerate(_popularity):
+        if _tool_dicts[row].get("pop") != popularity:
+            meta = TOOL_REGISTRY[_TABLE.names[row]]
+            meta.popularity = popularity
+            _tool_dicts[row] = {**meta.to_dict(), "name": _prefix_tool_name(meta.name)}
+
+    # Re-sorting the previous ranking: after a few bumps it is nearly in order,
+    # which timsort handles in close to linear time. Ties go to registry order
+    previous = _ranked.get(None, range(len(_TABLE.names)))
+    ranked = sorted(previous, key=lambda row: (-_popularity[row], row))
+    by_category: dict[str, list[int]] = {}
+    for row in ranked:
+        by_category.setdefault(_TABLE.categories[row], []).append(row)
+    _ranked.clear()
+    _ranked[None] = tuple(ranked)
+    _ranked.update((cat, tuple(rows)) for cat, rows in by_category.items())
+    _ranked_version = _registry_version
+
+
+def _ranked_rows(category: str | None) -> tuple[int, ...]:
+    if _ranked_version != _registry_version:
+        _refresh_discovery()
+    return _ranked.get(category, ())
+
+
+def _query_candidates(query_lower: str) -> frozenset[int] | None:
+    """Rows that can contain query_lower; None when it is too short to index."""
+    if len(query_lower) < 3:
+        return None
+    # A substring match needs every trigram of the query, so this never drops a match
+    postings = sorted(
+        (_TRIGRAM_INDEX.get(gram, frozenset()) for gram in _trigrams(query_lower)), key=len
+    )
+    return postings[0].intersection(*postings[1:])
+
+
 def _prefix_tool_name(name: str) -> str:
-    return name if name.startswith("tokenette_") else f"tokenette_{name}"
+    prefixed = _PREFIXED.get(name)
+    if prefixed is None:
+        prefixed = name if name.startswith(_PREFIX) else _PREFIX + name
+    return prefixed
 
 
 def _strip_tool_prefix(name: str) -> str:
-    return name.replace("tokenette_", "", 1) if name.startswith("tokenette_") else name
+    stripped = _STRIPPED.get(name)
+    if stripped is None:
+        stripped = name.removeprefix(_PREFIX)
+    return stripped
 
 
 async def discover_tools(
@@ -545,40 +679,60 @@ async def discover_tools(
     Returns:
         List of matching tools with minimal metadata
     """
-    results = []
-
-    for name, metadata in TOOL_REGISTRY.items():
-        # Filter by category
-        if category and metadata.category != category:
-            continue
-
-        # Filter by query
-        if query:
-            query_lower = query.lower()
-            matches = (
-                query_lower in name.lower()
-                or query_lower in metadata.description.lower()
-                or any(query_lower in tag for tag in metadata.tags)
-            )
-            if not matches:
-                continue
-
-        tool_dict = metadata.to_dict()
-        tool_dict["name"] = _prefix_tool_name(name)
-        results.append(tool_dict)
-
-    # Sort by popularity
-    results.sort(key=lambda x: x.get("pop", 0), reverse=True)
-
-    # Limit results
-    results = results[:limit]
-
+    selected, tokens = _discover(category, query, limit, _registry_version)
+    # The memo only holds row numbers; every caller gets its own dicts to keep
+    tools = [dict(_tool_dicts[row]) for row in selected]
     return {
-        "tools": results,
-        "total": len(results),
-        "categories": list({m.category for m in TOOL_REGISTRY.values()}),
-        "_tokens": len(results) * 20,  # Approximate token cost
+        "tools": tools,
+        "total": len(tools),
+        "categories": list(_CATEGORIES),
+        "_tokens": tokens,  # Approximate token cost
+    }
+
+
+@lru_cache(maxsize=256)
+def _discover(
+    category: str | None, query: str | None, limit: int, version: int
+) -> tuple[tuple[int, ...], int]:
+    """Rows matching a discovery request and their approximate token cost."""
+    # version only keys the cache, so a popularity change starts fresh entries
+    query_lower = query.lower() if query else None
+
+    # Rows are already in popularity order, so the filters run lazily and stop
+    # at the limit; no heap or sort over the matches is needed
+    rows: Iterable[int] = _ranked_rows(category or None)
+    if query_lower:
+        candidates = _query_candidates(query_lower)
+        if candidates is not None:
+            rows = filter(candidates.__contains__, rows)
+        haystacks = _TABLE.haystacks
+        rows = (row for row in rows if query_lower in haystacks[row])
+
+    # A negative limit keeps the old slicing semantics (drop that many from the end)
+    selected = tuple(islice(rows, limit)) if limit >= 0 else tuple(rows)[:limit]
+    return selected, sum(_TOKEN_ESTIMATES[row] for row in selected)
+
+
+# Schema dicts never change, so both include_examples variants are built once;
+# get_tool_details hands out deep copies, so the entries and TOOL_SCHEMAS stay intact
+_DETAILS_WITH_EXAMPLES: Mapping[str, dict[str, Any]] = MappingProxyType(
+    {
+        name: {**schema.to_dict(), "name": _prefix_tool_name(schema.name)}
+        for name, schema in TOOL_SCHEMAS.items()
     }
+)
+_DETAILS_NO_EXAMPLES: Mapping[str, dict[str, Any]] = MappingProxyType(
+    {
+        name: {key: value for key, value in details.items() if key != "examples"}
+        for name, details in _DETAILS_WITH_EXAMPLES.items()
+    }
+)
+
+# Argument names each tool accepts, by registry row (None: no schema, unchecked)
+_TOOL_PARAMS: tuple[frozenset[str] | None, ...] = tuple(
+    frozenset(TOOL_SCHEMAS[name].parameters) if name in TOOL_SCHEMAS else None
+    for name in _TABLE.names
+)
 
 
 async def get_tool_details(
@@ -597,21 +751,36 @@ async def get_tool_details(
     Returns:
         Full tool schema with parameters
     """
-    lookup_name = _strip_tool_prefix(tool_name)
-    if lookup_name not in TOOL_SCHEMAS:
+    details = _DETAILS_WITH_EXAMPLES if include_examples else _DETAILS_NO_EXAMPLES
+    result = details.get(_strip_tool_prefix(tool_name))
+    if result is None:
         return {
             "error": f"Tool '{tool_name}' not found",
-            "available": [_prefix_tool_name(n) for n in TOOL_REGISTRY],
+            "available": list(_PREFIXED_TOOL_LIST),
         }
 
-    schema = TOOL_SCHEMAS[lookup_name]
-    result = schema.to_dict()
-    result["name"] = _prefix_tool_name(schema.name)
+    return copy.deepcopy(result)
 
-    if not include_examples:
-        result.pop("examples", None)
 
-    return result
+@cache
+def _tool_functions() -> tuple[Callable[..., Any] | None, ...]:
+    """Tool dispatch table by registry row (None: not implemented), built on first use."""
+    # Imported here to avoid circular imports
+    from tokenette.tools import analysis, file_ops
+
+    functions = {
+        "discover_tools": discover_tools,
+        "get_tool_details": get_tool_details,
+        "read_file_smart": file_ops.read_file_smart,
+        "write_file_diff": file_ops.write_file_diff,
+        "search_code_semantic": file_ops.search_code_semantic,
+        "get_file_structure": file_ops.get_file_structure,
+        "batch_read_files": file_ops.batch_read_files,
+        "analyze_code": analysis.analyze_code,
+        "find_bugs": analysis.find_bugs,
+        "get_complexity": analysis.get_complexity,
+    }
+    return tuple(functions.get(name) for name in _TABLE.names)
 
 
 async def execute_tool(
@@ -636,47 +805,42 @@ async def execute_tool(
     Returns:
         Optimized tool result
     """
+    global _registry_version
+
     lookup_name = _strip_tool_prefix(tool_name)
-    if lookup_name not in TOOL_REGISTRY:
+    row = _ROWS.get(lookup_name)
+    if row is None:
         return {
             "error": f"Tool '{tool_name}' not found",
-            "available": [_prefix_tool_name(n) for n in TOOL_REGISTRY],
+            "available": list(_PREFIXED_TOOL_LIST),
         }
 
-    # Import tools dynamically to avoid circular imports
-    from tokenette.tools import analysis, file_ops
-
-    # Tool dispatch map
-    tool_functions: dict[str, Callable[..., Any]] = {
-        "discover_tools": discover_tools,
-        "get_tool_details": get_tool_details,
-        "read_file_smart": file_ops.read_file_smart,
-        "write_file_diff": file_ops.write_file_diff,
-        "search_code_semantic": file_ops.search_code_semantic,
-        "get_file_structure": file_ops.get_file_structure,
-        "batch_read_files": file_ops.batch_read_files,
-        "analyze_code": analysis.analyze_code,
-        "find_bugs": analysis.find_bugs,
-        "get_complexity": analysis.get_complexity,
-    }
-
     if lookup_name == "batch_ops":
         from tokenette.core.batcher import InteractionBatcher
 
         batcher = InteractionBatcher()
         return await batcher.batch_file_operations(arguments.get("operations", []))
 
-    if lookup_name not in tool_functions:
+    func = _tool_functions()[row]
+    if func is None:
         return {"error": f"Tool '{tool_name}' not yet implemented", "status": "pending"}
 
-    # Execute tool
-    func = tool_functions[lookup_name]
+    # Rejected before the call, rather than as a TypeError from inside it
+    expected = _TOOL_PARAMS[row]
+    if expected is not None and not expected.issuperset(arguments):
+        unknown = ", ".join(sorted(arguments.keys() - expected))
+        return {
+            "status": "error",
+            "tool": _prefix_tool_name(lookup_name),
+            "error": f"Unknown arguments: {unknown}",
+        }
 
     try:
         result = await func(**arguments, ctx=ctx)
 
         # Update popularity
-        TOOL_REGISTRY[lookup_name].popularity += 1
+        _popularity[row] += 1
+        _registry_version += 1
 
         return {"status": "success", "tool": _prefix_tool_name(lookup_name), "result": result}
     except Exception as e:
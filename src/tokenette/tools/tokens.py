@@ -68,6 +68,13 @@ CODE_PATTERNS = {
     },
 }
 
+# Precompiled estimator patterns (count_tokens runs on every tool payload)
+_STRING_RE = re.compile(r'["\'].*?["\']')
+_COMMENT_RE = re.compile(r"#.*|//.*|/\*.*?\*/", re.DOTALL)
+_NUMBER_RE = re.compile(r"\b\d+\.?\d*\b")
+_LONG_STRING_RE = re.compile(r'["\'][^"\']{50,}["\']')
+_URL_RE = re.compile(r"https?://\S+")
+
 # Model pricing (tokens-based for some, multiplier for GitHub Copilot)
 MODEL_COSTS = {
     # GitHub Copilot Pro (multiplier-based, 300 premium/month)
@@ -121,26 +128,24 @@ def count_tokens(text: str, language: str | None = None, detailed: bool = False)
 
         # Code-specific counts
         if language:
-            breakdown["strings"] = len(re.findall(r'["\'].*?["\']', text))
-            breakdown["comments"] = len(re.findall(r"#.*|//.*|/\*.*?\*/", text, re.DOTALL))
-            breakdown["numbers"] = len(re.findall(r"\b\d+\.?\d*\b", text))
+            breakdown["strings"] = len(_STRING_RE.findall(text))
+            breakdown["comments"] = len(_COMMENT_RE.findall(text))
+            breakdown["numbers"] = len(_NUMBER_RE.findall(text))
 
     # Adjust for special content
     adjustments = 0
 
     # Whitespace is efficient (multiple spaces = 1 token usually)
-    whitespace_ratio = len(re.findall(r"\s+", text)) / max(text_length, 1)
-    if whitespace_ratio > 0.2:
+    if _whitespace_runs(text) / max(text_length, 1) > 0.2:
         adjustments -= int(base_tokens * 0.1)
 
-    # Long strings are token-expensive
-    long_strings = re.findall(r'["\'][^"\']{50,}["\']', text)
-    if long_strings:
-        adjustments += len(long_strings) * 10
+    # Long strings are token-expensive (skip the scan when there are no quotes)
+    if '"' in text or "'" in text:
+        adjustments += len(_LONG_STRING_RE.findall(text)) * 10
 
     # URLs and paths are expensive
-    urls = re.findall(r"https?://\S+", text)
-    adjustments += len(urls) * 5
+    if "://" in text:
+        adjustments += len(_URL_RE.findall(text)) * 5
 
     final_tokens = max(1, base_tokens + adjustments)
 
@@ -151,6 +156,15 @@ def count_tokens(text: str, language: str | None = None, detailed: bool = False)
     return TokenCount(text_length=text_length, estimated_tokens=final_tokens, breakdown=breakdown)
 
 
+def _whitespace_runs(text: str) -> int:
+    """Number of whitespace runs in text, i.e. len(re.findall(r"\\s+", text))."""
+    # str.split() splits on the same runs in C without building match objects
+    words = len(text.split())
+    if not words:
+        return 1 if text else 0
+    return words - 1 + text[:1].isspace() + text[-1:].isspace()
+
+
 def count_tokens_in_file(file_path: str, detailed: bool = False) -> TokenCount:
     """Count tokens in a file."""
     path = Path(file_path)
@@ -255,12 +269,14 @@ class BudgetTracker:
         self.used: float = 0.0
         self.history: list[dict] = []
         self.start_date = datetime.now().replace(day=reset_day)
+        self.version = 0  # Bumped on every change to used/history
 
     def record_usage(
         self, model: str, multiplier: float, tokens_in: int = 0, tokens_out: int = 0
     ) -> None:
         """Record a usage event."""
         self.used += multiplier
+        self.version += 1
         self.history.append(
             {
                 "timestamp": datetime.now().isoformat(),
@@ -332,6 +348,7 @@ class BudgetTracker:
         """Reset budget for new billing cycle."""
         self.used = 0.0
         self.history.clear()
+        self.version += 1
         self.start_date = datetime.now()
 
     def get_usage_by_model(self) -> dict[str, float]:
@@ -277,6 +277,136 @@ class TestMetrics:
         assert snapshot["totals"]["tokens_saved"] >= 10
         assert snapshot["totals"]["cache_hits"] == 1
 
+    def test_metrics_tracker_precomputed_tokens(self, tmp_path):
+        """Known token counts should be used instead of estimating from the payload."""
+        from tokenette.config import MetricsConfig
+        from tokenette.core.metrics import MetricsTracker
+
+        cfg = MetricsConfig(persist_metrics=False, metrics_file=tmp_path / "metrics.json")
+        tracker = MetricsTracker(cfg)
+
+        tracker.record_tool_call(
+            "tokenette_optimize",
+            input_data={"content": "x" * 4000},
+            output_data={"content": "x" * 4000},
+            output_tokens=7,
+        )
+
+        totals = tracker.snapshot()["totals"]
+        assert totals["input_tokens"] >= 1000
+        assert totals["output_tokens"] == 7
+
+    def test_metrics_tracker_debounced_persist(self, tmp_path):
+        """Writes should be deferred until the interval elapses or flush() is called."""
+        import gc
+        import gzip
+        import json
+        import threading
+        import weakref
+
+        from tokenette.config import MetricsConfig
+        from tokenette.core.metrics import MetricsTracker
+
+        path = tmp_path / "metrics.json"
+        cfg = MetricsConfig(persist_interval_seconds=60, metrics_file=path)
+        tracker = MetricsTracker(cfg)
+
+        for _ in range(3):
+            tracker.record_tool_call("tokenette_read_file", input_data="x" * 40)
+        assert not path.exists()
+
+        tracker.flush()
+        assert json.loads(gzip.decompress(path.read_bytes()))["totals"]["calls"] == 3
+
+        reloaded = MetricsTracker(cfg)
+        assert reloaded.snapshot()["totals"]["calls"] == 3
+
+        # Uncompressed files from earlier versions still load
+        path.write_text(json.dumps(reloaded.snapshot()))
+        assert MetricsTracker(cfg).snapshot()["totals"]["calls"] == 3
+
+        # Concurrent flushes take turns on the tmp file and leave a readable result
+        def worker() -> None:
+            for _ in range(20):
+                tracker.record_tool_call("tokenette_read_file", input_tokens=1)
+                tracker.flush()
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert json.loads(gzip.decompress(path.read_bytes()))["totals"]["calls"] == 83
+
+        # The exit-time flush hook does not keep trackers alive
+        ref = weakref.ref(reloaded)
+        del reloaded
+        gc.collect()
+        assert ref() is None
+
+    def test_metrics_tracker_concurrent_tools(self, tmp_path):
+        """Per-thread shards should merge into the tool table without losing updates."""
+        import threading
+
+        from tokenette.config import MetricsConfig
+        from tokenette.core.metrics import MetricsTracker
+
+        cfg = MetricsConfig(persist_metrics=False, metrics_file=tmp_path / "metrics.json")
+        tracker = MetricsTracker(cfg)
+
+        def worker(name: str) -> None:
+            for _ in range(500):
+                tracker.record_tool_call(name, input_tokens=1, output_tokens=1, cache_hit=True)
+
+        threads = [threading.Thread(target=worker, args=(f"tool_{i % 2}",)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        tracker.record_cache(hit=False, tokens_saved=10)
+
+        snapshot = tracker.snapshot()
+        assert snapshot["totals"]["calls"] == 2000
+        assert snapshot["totals"]["cache_hits"] == 2000
+        assert snapshot["totals"]["cache_misses"] == 1
+        assert snapshot["tools"]["tool_0"]["calls"] == 1000
+        assert snapshot["totals"]["hit_ratio"] == round(2000 / 2001, 4)
+        assert snapshot["tools"]["tool_0"]["hit_ratio"] == 1.0
+
+    def test_metrics_tracker_thread_exits_mid_snapshot(self, tmp_path):
+        """A thread that records and exits while a snapshot drains keeps its update."""
+        import threading
+
+        from tokenette.config import MetricsConfig
+        from tokenette.core.metrics import MetricsTracker
+
+        cfg = MetricsConfig(persist_metrics=False, metrics_file=tmp_path / "metrics.json")
+        tracker = MetricsTracker(cfg)
+        ready, resume = threading.Event(), threading.Event()
+
+        def worker() -> None:
+            tracker.record_tool_call("late", input_tokens=1)
+            ready.set()
+            resume.wait()
+            tracker.record_tool_call("late", input_tokens=1)
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        ready.wait()
+
+        # Let the worker record once more and exit right after its shard is drained
+        drain = tracker._drain
+
+        def drain_then_exit(shard) -> None:
+            drain(shard)
+            if shard.owner is thread and not resume.is_set():
+                resume.set()
+                thread.join()
+
+        tracker._drain = drain_then_exit
+        assert tracker.snapshot()["tools"]["late"]["calls"] == 1
+        assert tracker.snapshot()["tools"]["late"]["calls"] == 2
+
 
 # ─── BATCHER TESTS ───────────────────────────────────────────────
 
@@ -299,6 +429,181 @@ class TestBatcher:
         assert "payload" in result
         assert "tokens" in result
 
+    @pytest.mark.asyncio
+    async def test_batch_writes_same_path_in_order(self, tmp_path):
+        from tokenette.core.batcher import InteractionBatcher
+
+        first = tmp_path / "first.py"
+        second = tmp_path / "second.py"
+        first.write_text("a\nb\nc")
+        second.write_text("1\n2\n3")
+
+        batcher = InteractionBatcher()
+        await batcher.batch_file_operations(
+            [
+                {"type": "write", "path": str(first), "content": "a\nX\nc"},
+                {"type": "write", "path": str(second), "content": "1\n2\n4"},
+                {"type": "write", "path": str(first), "content": "a\nX\nY"},
+            ]
+        )
+
+        assert first.read_text() == "a\nX\nY"
+        assert second.read_text() == "1\n2\n4"
+
+    @pytest.mark.asyncio
+    async def test_batch_write_line_endings_match_applier(self, tmp_path):
+        """Test content writes number lines the way write_file_diff reads them."""
+        from tokenette.core.batcher import InteractionBatcher
+
+        cr_only = tmp_path / "cr.txt"
+        cr_only.write_bytes(b"a\rb\rc\r")
+        form_feed = tmp_path / "ff.txt"
+        form_feed.write_bytes(b"a\x0cb\nc\n")
+
+        batcher = InteractionBatcher()
+        await batcher._run_write({"path": str(cr_only), "content": "a\nB\nc"})
+        unchanged = await batcher._run_write({"path": str(form_feed), "content": "a\x0cb\nc"})
+
+        assert cr_only.read_bytes() == b"a\nB\nc\n"
+        assert unchanged["status"] == "unchanged"
+        assert form_feed.read_bytes() == b"a\x0cb\nc\n"
+
+    @pytest.mark.asyncio
+    async def test_batch_duplicate_reads_dispatched_once(self, tmp_path, monkeypatch):
+        from tokenette.config import MetricsConfig
+        from tokenette.core import batcher as batcher_module
+        from tokenette.core.metrics import MetricsTracker
+
+        file = tmp_path / "demo.py"
+        file.write_text("def hello():\n    return 'world'\n")
+
+        calls = []
+        real_read = batcher_module.read_files_smart_batch
+
+        async def counting_read(paths, *args, **kwargs):
+            calls.extend(paths)
+            return await real_read(paths, *args, **kwargs)
+
+        monkeypatch.setattr(batcher_module, "read_files_smart_batch", counting_read)
+
+        metrics = MetricsTracker(
+            MetricsConfig(persist_metrics=False, metrics_file=tmp_path / "metrics.json")
+        )
+        op = {"type": "read", "path": str(file), "strategy": "full"}
+        batcher = batcher_module.InteractionBatcher(metrics)
+        await batcher.batch_file_operations([op, dict(op)])
+
+        assert calls == [str(file)]
+        assert metrics.snapshot()["totals"]["cache_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_batch_concurrency_is_bounded(self):
+        import asyncio
+
+        from tokenette.core.batcher import InteractionBatcher
+
+        batcher = InteractionBatcher()
+        assert batcher.MAX_CONCURRENCY < batcher.MAX_BATCH_OPS
+        running = peak = 0
+
+        async def search(op):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return {"query": op["query"]}
+
+        batcher._run_search = search
+        ops = [{"type": "search", "query": f"q{n}"} for n in range(batcher.MAX_BATCH_OPS)]
+        await batcher.batch_file_operations(ops)
+        assert peak == batcher.MAX_CONCURRENCY
+
+    @pytest.mark.asyncio
+    async def test_repeated_search_records_tokens_saved(self):
+        from tokenette.config import MetricsConfig
+        from tokenette.core.batcher import InteractionBatcher
+        from tokenette.core.metrics import MetricsTracker
+
+        tracker = MetricsTracker(MetricsConfig(persist_metrics=False))
+        batcher = InteractionBatcher(tracker)
+
+        async def search(op):
+            return {"query": op["query"], "matches": [{"file": "a.py", "line": 1}] * 20}
+
+        batcher._run_search = search
+        await batcher.batch_file_operations([{"type": "search", "query": "needle"}] * 2)
+
+        totals = tracker.snapshot()["totals"]
+        assert totals["cache_hits"] == 1
+        assert totals["tokens_saved"] > 0
+
+    def test_deduplicate_reads_shared_imports(self):
+        from tokenette.core.batcher import InteractionBatcher
+
+        body = "\n" + "pass\n" * 500
+        results = [
+            {"content": "import os\nimport osmium\nx = 1" + body},
+            {"content": "import os\nimport sys\ny = 2" + body},
+        ]
+        results, shared = InteractionBatcher()._deduplicate_reads(results)
+
+        assert shared == {"1": "import os"}
+        assert results[0]["content"] == "§1\nimport osmium\nx = 1" + body
+        assert results[1]["content"].startswith("§1\nimport sys")
+
+        # Small batches are returned untouched
+        small = [{"content": "import os\nx = 1"}, {"content": "import os\ny = 2"}]
+        assert InteractionBatcher()._deduplicate_reads(small) == (small, {})
+
+    def test_to_diff_large_file_single_hunk(self, tmp_path):
+        from tokenette.core.batcher import InteractionBatcher
+
+        file = tmp_path / "big.txt"
+        file.write_text("\n".join(f"line {i}" for i in range(15_000)))
+
+        batcher = InteractionBatcher()
+        diff = batcher._to_diff(str(file), "\n".join(f"row {i}" for i in range(15_000)))
+
+        assert diff.count("@@") == 2
+        assert "@@ -1,15000 +1,15000 @@" in diff
+
+    def test_to_diff_trims_shared_lines(self, tmp_path):
+        from tokenette.core.batcher import InteractionBatcher
+
+        lines = [f"line {i}" for i in range(200)]
+        file = tmp_path / "mid.txt"
+        file.write_text("\n".join(lines))
+
+        batcher = InteractionBatcher()
+        assert batcher._to_diff(str(file), "\n".join(lines)) == ""
+
+        lines[101] = "changed"
+        diff = batcher._to_diff(str(file), "\n".join(lines))
+        assert "@@ -99,7 +99,7 @@" in diff
+        assert "+changed" in diff
+
+    def test_to_diff_matches_untrimmed_difflib(self, tmp_path):
+        import difflib
+
+        from tokenette.core.batcher import InteractionBatcher
+
+        batcher = InteractionBatcher()
+        cases = [
+            ("baaab", "baaaab"),
+            ("abbba", "abbbba"),
+            ("aaaaaaaaaa", "aaaaaaaaaaa"),
+            ("aabbaabbaabb", "aabbaabaabb"),
+            ("abababab", "abababcab"),
+        ]
+        for old, new in cases:
+            file = tmp_path / "rep.txt"
+            file.write_text("\n".join(old) + "\n")
+            expected = difflib.unified_diff(
+                list(old), list(new), f"a/{file}", f"b/{file}", lineterm="", n=3
+            )
+            assert batcher._to_diff(str(file), "\n".join(new)) == "\n".join(expected)
+
 
 # ─── FILE OPS TESTS ──────────────────────────────────────────────
 
@@ -355,6 +660,21 @@ class Greeter:
         assert result is not None
         assert isinstance(result, dict)
 
+    @pytest.mark.asyncio
+    async def test_batch_read_shared_import_refs(self, tmp_path):
+        """Test batch reads reference shared imports the same way as batch_ops."""
+        from tokenette.tools.file_ops import batch_read_files
+
+        body = "\n" + "pass\n" * 500
+        (tmp_path / "a.py").write_text("import os\nx = 1" + body)
+        (tmp_path / "b.py").write_text("import os\ny = 2" + body)
+        paths = [str(tmp_path / "a.py"), str(tmp_path / "b.py")]
+
+        result = await batch_read_files(paths, strategy="full")
+
+        assert result["shared"] == {"1": "import os"}
+        assert all(f["content"].startswith("§1\n") for f in result["files"])
+
 
 # ─── ANALYSIS TESTS ──────────────────────────────────────────────
 
@@ -420,12 +740,77 @@ def complex_function(x, y, z):
         assert result["metrics"]["cyclomatic"] >= 5  # Should have some complexity
 
 
+# ─── META TOOL TESTS ─────────────────────────────────────────────
+
+
+class TestMeta:
+    """Test tool discovery and execution."""
+
+    @pytest.mark.asyncio
+    async def test_discover_tools_ranked_and_limited(self):
+        """Test discovery returns at most limit tools, most popular first."""
+        from tokenette.tools.meta import discover_tools
+
+        result = await discover_tools(query="file", limit=3)
+        pops = [t["pop"] for t in result["tools"]]
+
+        assert len(pops) == 3
+        assert pops == sorted(pops, reverse=True)
+        assert all(t["name"].startswith("tokenette_") for t in result["tools"])
+        assert (await discover_tools(category="missing"))["tools"] == []
+
+        # Editing a response must not leak into the next identical request
+        result["tools"][0]["pop"] = -1
+        result["tools"].clear()
+        again = await discover_tools(query="file", limit=3)
+        assert [t["pop"] for t in again["tools"]] == pops
+
+    @pytest.mark.asyncio
+    async def test_tool_details_are_copies(self):
+        """Test editing one get_tool_details result leaves the schemas intact."""
+        from tokenette.tools.meta import TOOL_SCHEMAS, get_tool_details
+
+        details = await get_tool_details("read_file_smart")
+        details["parameters"].pop("path")
+
+        assert "path" in (await get_tool_details("read_file_smart"))["parameters"]
+        assert "path" in (await get_tool_details("read_file_smart", False))["parameters"]
+        assert "path" in TOOL_SCHEMAS["read_file_smart"].parameters
+
+    @pytest.mark.asyncio
+    async def test_execute_tool_rejects_unknown_arguments(self):
+        """Test unknown arguments are rejected before the tool runs."""
+        from tokenette.tools.meta import execute_tool
+
+        result = await execute_tool("get_complexity", {"path": "x.py", "bogus": 1})
+
+        assert result["status"] == "error"
+        assert result["error"] == "Unknown arguments: bogus"
+
+        missing = await execute_tool("no_such_tool", {})
+        assert isinstance(missing["available"], list)
+        assert "tokenette_get_complexity" in missing["available"]
+
+
 # ─── INTEGRATION TESTS ───────────────────────────────────────────
 
 
 class TestIntegration:
     """Integration tests for the full system."""
 
+    @pytest.fixture
+    def isolated_config(self, tmp_path):
+        """Global config whose cache and metrics files live under tmp_path."""
+        from tokenette.config import TokenetteConfig, reset_config, set_config
+
+        config = TokenetteConfig(
+            cache={"l2_directory": tmp_path / "l2", "l3_directory": tmp_path / "l3"},
+            metrics={"metrics_file": tmp_path / "metrics.json"},
+        )
+        set_config(config)
+        yield config
+        reset_config()
+
     def test_imports(self):
         """Test all main imports work."""
         from tokenette import (
@@ -434,6 +819,19 @@ class TestIntegration:
 
         assert __version__ == "2.0.1"
 
+    def test_server_import_keeps_tool_modules_lazy(self):
+        """Test importing the server leaves the lazily loaded tool modules unloaded."""
+        import subprocess
+        import sys
+
+        code = (
+            "import sys, tokenette.server\n"
+            "from tokenette.tools import _LAZY_MODULES\n"
+            "print(sorted(m for m in _LAZY_MODULES if m in sys.modules))"
+        )
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+        assert out.stdout.strip() == "[]"
+
     def test_server_creation(self):
         """Test server can be created."""
         from tokenette.server import create_server
@@ -441,6 +839,154 @@ class TestIntegration:
         server = create_server()
         assert server.name == "tokenette"
 
+    @pytest.mark.asyncio
+    async def test_discover_tools_by_category(self, isolated_config):
+        """Test discovery filters by category and reuses its response."""
+        from fastmcp import Client
+
+        from tokenette.server import create_server
+
+        async with Client(create_server()) as client:
+            first = await client.call_tool("tokenette_discover_tools", {"category": "file"})
+            second = await client.call_tool("tokenette_discover_tools", {"category": "file"})
+
+        assert {t["cat"] for t in first.structured_content["tools"]} == {"file"}
+        assert second.structured_content == first.structured_content
+
+    @pytest.mark.asyncio
+    async def test_budget_status_tracks_usage(self, isolated_config):
+        """Test the memoized budget status refreshes after usage is recorded."""
+        from fastmcp import Client
+
+        from tokenette.server import create_server
+        from tokenette.tools import get_budget_tracker
+
+        tracker = get_budget_tracker()
+        server = create_server()
+        async with Client(server) as client:
+            before = await client.call_tool("tokenette_budget_status", {})
+            tracker.record_usage("claude-sonnet-4", 1.0)
+            after = await client.call_tool("tokenette_budget_status", {})
+
+            # Editing one report must not change what the memo serves next
+            budget_status = (await server.get_tool("tokenette_budget_status")).fn
+            (await budget_status())["used"] = -1
+            again = await budget_status()
+        tracker.reset()
+
+        assert after.structured_content["used"] == before.structured_content["used"] + 1.0
+        assert again["used"] == after.structured_content["used"]
+
+    @pytest.mark.asyncio
+    async def test_model_profiles_resource(self, isolated_config):
+        """Test the models resource serializes the model profiles."""
+        import json
+
+        from fastmcp import Client
+
+        from tokenette.core.router import MODEL_PROFILES
+        from tokenette.server import create_server
+
+        async with Client(create_server()) as client:
+            contents = await client.read_resource("tokenette://models")
+
+        profiles = json.loads(contents[0].text)
+        assert profiles.keys() == MODEL_PROFILES.keys()
+
+    @pytest.mark.asyncio
+    async def test_optimize_repeat_input_served_from_memo(self, isolated_config):
+        """Test repeated tokenette_optimize inputs skip the pipeline."""
+        from fastmcp import Client
+
+        from tokenette.server import create_server
+
+        data = {"items": [{"id": i, "name": f"item {i}"} for i in range(20)]}
+        server = create_server()
+        async with Client(server) as client:
+            first = await client.call_tool("tokenette_optimize", {"data": data})
+            second = await client.call_tool("tokenette_optimize", {"data": data})
+
+            # A caller editing its response must not change what the memo serves next
+            optimize = (await server.get_tool("tokenette_optimize")).fn
+            edited = await optimize(data)
+            edited["data"] = None
+            edited["_tokens"]["final"] = -1
+            third = await optimize(data)
+
+        assert second.structured_content["_source"] == "cache"
+        assert second.structured_content["data"] == first.structured_content["data"]
+        assert third["data"] == first.structured_content["data"]
+        assert third["_tokens"] == first.structured_content["_tokens"]
+
+    @pytest.mark.asyncio
+    async def test_lifespan_close_errors_keep_the_body_error(self, isolated_config):
+        """Test a failing close is attached to the error that stopped the server."""
+        from fastmcp import FastMCP
+
+        from tokenette.server import lifespan
+
+        async def broken_close():
+            raise OSError("close failed")
+
+        mcp = FastMCP("lifespan-test")
+        with pytest.raises(ValueError) as excinfo:
+            async with lifespan(mcp, isolated_config):
+                mcp.state.cache.close = broken_close
+                raise ValueError("stopped")
+        assert "close failed" in excinfo.value.__notes__[0]
+
+        with pytest.raises(BaseExceptionGroup):
+            async with lifespan(mcp, isolated_config):
+                mcp.state.cache.close = broken_close
+
+    @pytest.mark.asyncio
+    async def test_cached_reads_match_the_file(self, isolated_config, tmp_path):
+        """Test cached file reads survive batch dedup and follow writes."""
+        from fastmcp import Client
+
+        from tokenette.server import create_server
+
+        body = "\n" + "pass\n" * 500
+        first, second = tmp_path / "a.py", tmp_path / "b.py"
+        first.write_text("import os\nx = 1" + body)
+        second.write_text("import os\ny = 2" + body)
+        read = {"path": str(first)}
+        async with Client(create_server()) as client:
+            direct = await client.call_tool("tokenette_read_file", read)
+            await client.call_tool("tokenette_batch_read", {"paths": [str(first), str(second)]})
+            cached = await client.call_tool("tokenette_read_file", read)
+            await client.call_tool(
+                "tokenette_write_file",
+                {"path": str(first), "diff": "@@ -1,2 +1,2 @@\n import os\n-x = 1\n+x = 3\n"},
+            )
+            rewritten = await client.call_tool("tokenette_read_file", read)
+
+        assert cached.structured_content["from_cache"] is True
+        assert cached.structured_content["content"] == direct.structured_content["content"]
+        assert "x = 3" in rewritten.structured_content["content"]
+        assert "from_cache" not in rewritten.structured_content
+
+    @pytest.mark.asyncio
+    async def test_metrics_disabled_records_nothing(self, isolated_config):
+        """Test tools skip metric recording when metrics are disabled."""
+        from fastmcp import Client
+
+        from tokenette.server import create_server
+
+        isolated_config.metrics.enabled = False
+        source = isolated_config.metrics.metrics_file.with_name("demo.py")
+        source.write_text("print('hi')\n")
+        read = {"type": "read", "path": str(source)}
+        async with Client(create_server()) as client:
+            await client.call_tool("tokenette_count_tokens", {"text": "hello world"})
+            await client.call_tool("tokenette_batch_ops", {"operations": [read, read]})
+            metrics = await client.call_tool("tokenette_metrics", {})
+
+        session = metrics.structured_content["session"]
+        assert session["tools"] == {}
+        assert session["totals"]["cache_hits"] == 0
+        assert not isolated_config.metrics.metrics_file.exists()
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])